@@ -0,0 +1,86 @@
+import argparse
+import json
+import textwrap
+import time
+
+from model.citation import ArticleRecord
+from utils.document_dump import read_documents
+from xylose.scielodocument import Article
+
+
+FIELDS = ['publication_type', 'source', 'publication_date', 'volume', 'issue', 'first_page', 'doi', 'first_author']
+
+
+def extract(document):
+    """
+    Lê os campos das referências citadas utilizados pelo pipeline (identificador e FIELDS), como fazem Standardizer e
+    CrossrefAsyncCollector.
+
+    :param document: Article ou ArticleRecord
+    :return: lista de tuplas com os valores lidos
+    """
+    values = []
+    for cit in document.citations or []:
+        values.append((cit.data['v880'][0]['_'], document.collection_acronym) + tuple(getattr(cit, f) for f in FIELDS))
+    return values
+
+
+def run(documents, factory, repeat: int):
+    """
+    Mede o tempo para construir os documentos com factory e ler os campos de suas referências citadas.
+
+    :param documents: registros brutos dos documentos
+    :param factory: função que constrói um documento a partir do seu registro bruto
+    :param repeat: quantidade de repetições
+    :return: tupla (melhor tempo em segundos, valores lidos na última repetição)
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        values = [extract(factory(d)) for d in documents]
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, values
+
+
+def main():
+    usage = "compare the extraction of cited reference fields with xylose and with ArticleRecord"
+
+    parser = argparse.ArgumentParser(textwrap.dedent(usage))
+
+    parser.add_argument(
+        'input',
+        nargs='+',
+        help='raw ArticleMeta documents, one JSON per line (optionally .gz or .zst)'
+    )
+
+    parser.add_argument(
+        '-r', '--repeat',
+        default=5,
+        type=int,
+        dest='repeat',
+        help='number of repetitions (the best time is reported)'
+    )
+
+    args = parser.parse_args()
+
+    documents = [d.data for path in args.input for d in read_documents(path)]
+    total_citations = sum(len(d.get('citations', [])) for d in documents)
+
+    xylose_time, xylose_values = run(documents, Article, args.repeat)
+    record_time, record_values = run(documents, ArticleRecord, args.repeat)
+
+    print(json.dumps({
+        'documents': len(documents),
+        'citations': total_citations,
+        'xylose_seconds': round(xylose_time, 4),
+        'record_seconds': round(record_time, 4),
+        'xylose_citations_per_second': round(total_citations / xylose_time),
+        'record_citations_per_second': round(total_citations / record_time),
+        'speedup': round(xylose_time / record_time, 2),
+        'identical': xylose_values == record_values,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
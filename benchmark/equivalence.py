@@ -0,0 +1,407 @@
+import argparse
+import json
+import logging
+import os
+import pickle
+import re
+import sys
+import textwrap
+import time
+
+from benchmark.string_processing import reference_preprocess_journal_title
+from model.citation import ArticleRecord
+from model.standardizer import MIN_CHARS_LENGTH, MIN_WORDS_COUNT, Standardizer
+from model.standardizer import STATUS_EXACT, STATUS_EXACT_VALIDATED, STATUS_EXACT_VALIDATED_LR
+from model.standardizer import STATUS_EXACT_VALIDATED_LR_ML1, STATUS_EXACT_VOLUME_INFERRED_VALIDATED
+from model.standardizer import STATUS_EXACT_VOLUME_INFERRED_VALIDATED_LR, STATUS_EXACT_VOLUME_INFERRED_VALIDATED_LR_ML1
+from model.standardizer import STATUS_FUZZY_VALIDATED, STATUS_FUZZY_VALIDATED_LR, STATUS_FUZZY_VALIDATED_LR_ML1
+from model.standardizer import STATUS_FUZZY_VOLUME_INFERRED_VALIDATED, STATUS_FUZZY_VOLUME_INFERRED_VALIDATED_LR
+from model.standardizer import STATUS_FUZZY_VOLUME_INFERRED_VALIDATED_LR_ML1, STATUS_NOT_NORMALIZED
+from model.title_index import TITLE_INDEXES
+from utils.document_dump import read_documents
+from utils.mmap_db import MmapDatabase
+from utils.packed_keys import VALIDATION_TIERS, VALIDATION_TIERS_BASE
+
+
+VOLUME_IS_ORIGINAL = 'original'
+VOLUME_IS_INFERRED = 'inferred'
+
+# Status por modo de casamento, origem do volume e base de validação, como em Standardizer.get_status
+STATUSES = {
+    ('exact', VOLUME_IS_ORIGINAL, 'default'): STATUS_EXACT_VALIDATED,
+    ('exact', VOLUME_IS_ORIGINAL, 'lr'): STATUS_EXACT_VALIDATED_LR,
+    ('exact', VOLUME_IS_ORIGINAL, 'lr-ml1'): STATUS_EXACT_VALIDATED_LR_ML1,
+    ('exact', VOLUME_IS_INFERRED, 'default'): STATUS_EXACT_VOLUME_INFERRED_VALIDATED,
+    ('exact', VOLUME_IS_INFERRED, 'lr'): STATUS_EXACT_VOLUME_INFERRED_VALIDATED_LR,
+    ('exact', VOLUME_IS_INFERRED, 'lr-ml1'): STATUS_EXACT_VOLUME_INFERRED_VALIDATED_LR_ML1,
+    ('fuzzy', VOLUME_IS_ORIGINAL, 'default'): STATUS_FUZZY_VALIDATED,
+    ('fuzzy', VOLUME_IS_ORIGINAL, 'lr'): STATUS_FUZZY_VALIDATED_LR,
+    ('fuzzy', VOLUME_IS_ORIGINAL, 'lr-ml1'): STATUS_FUZZY_VALIDATED_LR_ML1,
+    ('fuzzy', VOLUME_IS_INFERRED, 'default'): STATUS_FUZZY_VOLUME_INFERRED_VALIDATED,
+    ('fuzzy', VOLUME_IS_INFERRED, 'lr'): STATUS_FUZZY_VOLUME_INFERRED_VALIDATED_LR,
+    ('fuzzy', VOLUME_IS_INFERRED, 'lr-ml1'): STATUS_FUZZY_VOLUME_INFERRED_VALIDATED_LR_ML1,
+}
+
+# Opções aceitas na especificação de uma implementação (ver parse_implementation)
+IMPLEMENTATION_OPTIONS = {
+    'db': str,
+    'fuzzy_engine': str,
+    'match_cache_size': int,
+    'citation_cache_size': int,
+    'match_cache': str,
+    'batch_size': int,
+}
+
+DEFAULT_IMPLEMENTATIONS = ['current', 'token:fuzzy_engine=token', 'no-cache:match_cache_size=0,citation_cache_size=0']
+
+
+def load_reference_db(path_db: str):
+    """
+    Carrega uma base de correção sem as conversões feitas por Standardizer (compactação dos dados de títulos e união
+    das bases de validação).
+
+    :param path_db: caminho do arquivo binário (pickle) ou do diretório gerado com generate_db --format mmap ou sections
+    :return: base de correção
+    """
+    if os.path.isdir(path_db):
+        return MmapDatabase(path_db)
+
+    with open(path_db, 'rb') as f:
+        return pickle.load(f)
+
+
+class ReferenceStandardizer:
+    """
+    Casamento e validação de títulos citados com a semântica original de Standardizer._standardize, sobre dicionários
+    e sets simples: sem índice de títulos, sem caches de referências citadas, sem chaves codificadas e com as três bases
+    de validação consultadas separadamente, em ordem.
+    As estruturas são copiadas de uma base de correção em qualquer formato (ver load_reference_db).
+    """
+
+    def __init__(self, db):
+        self.title_to_issnl = {title: set(issnls) for title, issnls in db['title-to-issnl'].items()}
+        self.issn_to_issnl = dict(db['issn-to-issnl'].items())
+        self.issn_to_equation = dict(db['issn-to-equation'].items())
+        self.issnl_to_issns = {issnl: list(data['issns'] if isinstance(data, dict) else data.issns)
+                               for issnl, data in db['issnl-to-data'].items()}
+
+        self.validation_bases = {}
+        if VALIDATION_TIERS_BASE in db:
+            key_to_mask = list(db[VALIDATION_TIERS_BASE].items())
+            for tier, name, bit in VALIDATION_TIERS:
+                self.validation_bases[tier] = {k for k, mask in key_to_mask if mask & bit}
+        else:
+            for tier, name, bit in VALIDATION_TIERS:
+                self.validation_bases[tier] = set(db[name])
+
+        # Resultados do casamento aproximado, função apenas do título e da base de correção
+        self.fuzzy_matches = {}
+
+    def match_exact(self, journal_title: str):
+        return self.title_to_issnl.get(journal_title, set())
+
+    def match_fuzzy(self, journal_title: str):
+        if journal_title in self.fuzzy_matches:
+            return self.fuzzy_matches[journal_title]
+
+        matches = set()
+        words = journal_title.split(' ')
+
+        if len(journal_title) > MIN_CHARS_LENGTH and len(words) >= MIN_WORDS_COUNT:
+            title_pattern = re.compile(r'[\w|\s]*'.join(words) + r'[\w|\s]*', re.UNICODE)
+
+            for official_title in [ot for ot in self.title_to_issnl if ot.startswith(words[0])]:
+                if title_pattern.fullmatch(official_title):
+                    matches = matches.union(self.title_to_issnl[official_title])
+
+        self.fuzzy_matches[journal_title] = matches
+        return matches
+
+    def infer_volume(self, issn: str, year: str):
+        equation = self.issn_to_equation.get(issn)
+        if equation:
+            a, b, r2 = equation
+            volume = a + (b * int(year))
+            if volume > 0:
+                return str(round(volume))
+
+    def extract_keys(self, cit, issns: set):
+        cit_year = cit.publication_date
+
+        if cit_year:
+            if len(cit_year) > 4:
+                cit_year = cit_year[:4]
+
+            if len(cit_year) == 4 and cit_year.isdigit():
+                cit_vol = cit.volume
+
+                if cit_vol and cit_vol.isdigit():
+                    return {'-'.join([i, cit_year, cit_vol]) for i in issns}, VOLUME_IS_ORIGINAL
+
+                keys = set()
+                for i in issns:
+                    cit_vol_inferred = self.infer_volume(i, cit_year)
+                    if cit_vol_inferred:
+                        keys.add('-'.join([i, cit_year, cit_vol_inferred]))
+                return keys, VOLUME_IS_INFERRED
+
+        return set(), None
+
+    def get_issnl(self, key: str):
+        issn = key.split('-')[0]
+        return self.issn_to_issnl.get(issn, '') or issn
+
+    def standardize(self, cit, cleaned_cit_journal_title: str, mode='exact'):
+        """
+        Casa e valida o título limpo de uma referência citada.
+
+        :param cit: referência citada
+        :param cleaned_cit_journal_title: título limpo do periódico citado
+        :param mode: mode de execução de casamento ['exact', 'fuzzy']
+        :return: tupla (status, ISSN-L sem hífen) ou None, caso a referência não seja normalizada
+        """
+        if mode == 'fuzzy':
+            matches = self.match_fuzzy(cleaned_cit_journal_title)
+        else:
+            matches = self.match_exact(cleaned_cit_journal_title)
+
+        if len(matches) == 1 and mode == 'exact':
+            return STATUS_EXACT, next(iter(matches))
+
+        elif len(matches) > 1 or (mode == 'fuzzy' and len(matches) == 1):
+            possible_issns = set()
+            for issnl in matches:
+                possible_issns.update(self.issnl_to_issns.get(issnl, []))
+
+            if possible_issns:
+                keys, mount_mode = self.extract_keys(cit, possible_issns)
+
+                if keys:
+                    for tier, name, bit in VALIDATION_TIERS:
+                        valid_matches = keys & self.validation_bases[tier]
+                        if len(valid_matches) == 1:
+                            return STATUSES[(mode, mount_mode, tier)], self.get_issnl(valid_matches.pop())
+                        elif valid_matches:
+                            return
+
+    def standardize_citations(self, document, use_exact: bool, use_fuzzy: bool):
+        """
+        Normaliza as referências citadas do tipo artigo de um documento, como Standardizer.standardize_citations para
+        referências ainda não normalizadas.
+
+        :param document: Article ou ArticleRecord
+        :param use_exact: usa casamento exato
+        :param use_fuzzy: usa casamento aproximado
+        :return: dicionário de id da referência citada para tupla (título limpo, status, ISSN-L com hífen)
+        """
+        results = {}
+
+        for cit in document.citations or []:
+            if cit.publication_type != 'article':
+                continue
+
+            cit_id = '{0}-{1}'.format(cit.data['v880'][0]['_'], document.collection_acronym)
+            cleaned_cit_journal_title = reference_preprocess_journal_title(cit.source)
+
+            if not cleaned_cit_journal_title or not (use_exact or use_fuzzy):
+                continue
+
+            result = None
+            if use_exact:
+                result = self.standardize(cit, cleaned_cit_journal_title)
+            if use_fuzzy and not result:
+                result = self.standardize(cit, cleaned_cit_journal_title, mode='fuzzy')
+
+            status, issnl = result or (STATUS_NOT_NORMALIZED, None)
+            results[cit_id] = (cleaned_cit_journal_title, status, issnl[:4] + '-' + issnl[4:] if issnl else None)
+
+        return results
+
+
+def parse_implementation(spec: str, default_db: str):
+    """
+    Interpreta a especificação de uma implementação, no formato NOME[:OPÇÃO=VALOR[,OPÇÃO=VALOR...]], com opções em
+    IMPLEMENTATION_OPTIONS; por exemplo, token:fuzzy_engine=token,db=bc-v1.mmdb.
+
+    :param spec: especificação
+    :param default_db: base de correção usada quando a opção db não é informada
+    :return: tupla (nome, dicionário de opções)
+    """
+    name, _, options_spec = spec.partition(':')
+    options = {'db': default_db}
+
+    for option in filter(None, options_spec.split(',')):
+        key, _, value = option.partition('=')
+        if key not in IMPLEMENTATION_OPTIONS:
+            raise ValueError('Unknown option %s in %s (expected one of %s)' % (key, spec, ', '.join(IMPLEMENTATION_OPTIONS)))
+        options[key] = IMPLEMENTATION_OPTIONS[key](value)
+
+    if options.get('fuzzy_engine', 'prefix') not in TITLE_INDEXES:
+        raise ValueError('Unknown fuzzy engine in %s' % spec)
+
+    return name, options
+
+
+def run_implementation(options: dict, documents: list, use_exact: bool, use_fuzzy: bool):
+    """
+    Normaliza as referências citadas dos documentos com Standardizer, configurado conforme options, sem persistir os
+    resultados.
+
+    :param options: opções da implementação (ver IMPLEMENTATION_OPTIONS)
+    :param documents: documentos
+    :param use_exact: usa casamento exato
+    :param use_fuzzy: usa casamento aproximado
+    :return: tupla (dicionário de resultados no formato de ReferenceStandardizer.standardize_citations, tempo de carga,
+    tempo de normalização)
+    """
+    kwargs = {k: options[k] for k in ('fuzzy_engine', 'match_cache_size', 'citation_cache_size') if k in options}
+    if 'match_cache' in options:
+        kwargs['path_match_cache'] = options['match_cache']
+
+    start = time.perf_counter()
+    sz = Standardizer(options['db'], use_exact=use_exact, use_fuzzy=use_fuzzy, **kwargs)
+    setup_seconds = time.perf_counter() - start
+
+    batch_size = options.get('batch_size', 0)
+    std_citations = {}
+
+    start = time.perf_counter()
+    for i, document in enumerate(documents):
+        if batch_size and i % batch_size == 0:
+            cleaned_titles, batch_matches = {}, {}
+        elif not batch_size:
+            cleaned_titles, batch_matches = None, None
+        std_citations.update(sz.standardize_citations(document, {}, cleaned_titles, batch_matches))
+    seconds = time.perf_counter() - start
+
+    sz.close()
+
+    results = {cit_id: (v['cited-journal-title'], v['status'], v.get('issn-l')) for cit_id, v in std_citations.items()}
+    return results, setup_seconds, seconds
+
+
+def compare(expected: dict, found: dict):
+    """
+    Compara os resultados de uma implementação com os da referência.
+
+    :param expected: resultados da referência
+    :param found: resultados da implementação
+    :return: lista de divergências (id, título limpo, status e ISSN-L esperados e obtidos)
+    """
+    divergences = []
+    for cit_id in sorted(set(expected) | set(found)):
+        e = expected.get(cit_id, (None, None, None))
+        f = found.get(cit_id, (None, None, None))
+        if e != f:
+            divergences.append({'_id': cit_id,
+                                'cited-journal-title': e[0] if e[0] is not None else f[0],
+                                'expected': {'cited-journal-title': e[0], 'status': e[1], 'issn-l': e[2]},
+                                'found': {'cited-journal-title': f[0], 'status': f[1], 'issn-l': f[2]}})
+    return divergences
+
+
+def main():
+    usage = "replay recorded cited references through the reference matching semantics and alternative implementations"
+
+    parser = argparse.ArgumentParser(textwrap.dedent(usage))
+
+    parser.add_argument(
+        'input',
+        nargs='+',
+        help='raw ArticleMeta documents, one JSON per line (optionally .gz or .zst), as written by --dump_documents'
+    )
+
+    parser.add_argument(
+        '-d', '--database',
+        required=True,
+        dest='db',
+        help='correction database used by the reference and by implementations without the db option'
+    )
+
+    parser.add_argument(
+        '-i', '--implementation',
+        default=None,
+        action='append',
+        dest='implementations',
+        help='implementation to compare, as NAME[:OPTION=VALUE,...] with options %s; may be repeated '
+             '(default: %s)' % (', '.join(IMPLEMENTATION_OPTIONS), ' '.join(DEFAULT_IMPLEMENTATIONS))
+    )
+
+    parser.add_argument(
+        '-m', '--mode',
+        default='both',
+        choices=['exact', 'fuzzy', 'both'],
+        dest='mode',
+        help='matching mode'
+    )
+
+    parser.add_argument(
+        '-o', '--output',
+        default=None,
+        dest='output',
+        help='JSON file where the report, with every divergence, is written (besides the standard output)'
+    )
+
+    args = parser.parse_args()
+
+    use_exact = args.mode in ('exact', 'both')
+    use_fuzzy = args.mode in ('fuzzy', 'both')
+
+    try:
+        implementations = [parse_implementation(spec, args.db) for spec in args.implementations or DEFAULT_IMPLEMENTATIONS]
+    except ValueError as e:
+        parser.error(str(e))
+
+    documents = [ArticleRecord(d.data) for path in args.input for d in read_documents(path)]
+    logging.info('%d documents read' % len(documents))
+
+    start = time.perf_counter()
+    reference = ReferenceStandardizer(load_reference_db(args.db))
+    reference_setup = time.perf_counter() - start
+
+    start = time.perf_counter()
+    expected = {}
+    for document in documents:
+        expected.update(reference.standardize_citations(document, use_exact, use_fuzzy))
+    reference_seconds = time.perf_counter() - start
+
+    report = {
+        'documents': len(documents),
+        'citations': len(expected),
+        'mode': args.mode,
+        'reference': {'setup_seconds': round(reference_setup, 3),
+                      'seconds': round(reference_seconds, 3),
+                      'citations_per_second': round(len(expected) / reference_seconds) if reference_seconds else None},
+        'implementations': {},
+    }
+
+    total_divergences = 0
+    for name, options in implementations:
+        logging.info('Running %s %s' % (name, options))
+        found, setup_seconds, seconds = run_implementation(options, documents, use_exact, use_fuzzy)
+        divergences = compare(expected, found)
+        total_divergences += len(divergences)
+
+        report['implementations'][name] = {
+            'options': options,
+            'setup_seconds': round(setup_seconds, 3),
+            'seconds': round(seconds, 3),
+            'citations_per_second': round(len(found) / seconds) if seconds else None,
+            'speedup': round(reference_seconds / seconds, 2) if seconds else None,
+            'divergences': len(divergences),
+            'divergent_citations': divergences,
+        }
+
+    output = json.dumps(report, indent=2)
+    print(output)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+
+    return 1 if total_divergences else 0
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
@@ -0,0 +1,179 @@
+import argparse
+import html
+import json
+import random
+import re
+import textwrap
+import time
+
+from utils.document_dump import read_documents
+from utils.string_processor import alpha_num_space, parenthesis_pattern, preprocess_author_name, preprocess_journal_title
+from utils.string_processor import remove_accents, remove_double_spaces, remove_invalid_chars, special_words
+
+
+# Trechos usados na geração de textos aleatórios: entidades HTML, parênteses, palavras especiais, caracteres de
+# controle, acentuados, de compatibilidade (decompostos por NFKD), marcas combinantes e de outros alfabetos
+RANDOM_PIECES = [
+    ' ', ' ', '  ', '\t', '\n', '\x0b', '\x00', '\x7f', '(', ')', '-', '|', '_', '.', ',', ':', ';', '/', '@', '&',
+    '&amp;', '&lt;', '&#233;', '&eacute;', '&nbsp;', '&#x2013;', '&bogus;',
+    'IMPRESSO', 'ONLINE', 'CDROM', 'PRINT', 'ELECTRONIC', 'ONL', 'INE', 'PRI', 'NT', 'Online', 'print',
+    'a', 'Z', 'q', '0', '7', 'Rev', 'Bras', 'J', 'Med', 'journal', 'of', 'São', 'Ciênc', 'Saúde', 'Coletiva',
+    'ç', 'Ñ', 'ø', 'Ø', 'ß', 'æ', 'Œ', 'ł', 'ő', 'ÿ', 'ﬁ', '½', '²', 'Ⅳ', 'ｆｕｌｌ', 'µ', 'ª', 'º', '℃', '™',
+    'é', 'á̧', '́', 'Ω', 'Ж', 'я', '中文', '한국', 'ا', ' ', ' ', ' ', '\ud800',
+]
+
+
+def reference_preprocess_journal_title(text, use_remove_invalid_chars=False):
+    """
+    Implementação original de preprocess_journal_title, etapa por etapa, usada como referência.
+    """
+    text = html.unescape(text)
+
+    if use_remove_invalid_chars:
+        text = remove_invalid_chars(text)
+
+    parenthesis_search = re.search(parenthesis_pattern, text)
+    while parenthesis_search is not None:
+        text = text[:parenthesis_search.start()] + text[parenthesis_search.end():]
+        parenthesis_search = re.search(parenthesis_pattern, text)
+
+    for sw in special_words:
+        text = text.replace(sw, '')
+    return remove_double_spaces(alpha_num_space(remove_accents(text), include_special_chars=True)).upper()
+
+
+def reference_preprocess_author_name(text):
+    """
+    Implementação original de preprocess_author_name, etapa por etapa, usada como referência.
+    """
+    return remove_double_spaces(alpha_num_space(remove_accents(text)))
+
+
+def get_document_texts(paths: list):
+    """
+    Obtém os títulos de periódicos e os nomes de autores citados em documentos do ArticleMeta.
+
+    :param paths: arquivos JSONL de documentos (ver read_documents)
+    :return: tupla (títulos, nomes)
+    """
+    titles = []
+    names = []
+    for path in paths:
+        for document in read_documents(path):
+            for cit in document.data.get('citations', []):
+                for field in ('v30', 'v18'):
+                    titles.extend(v['_'] for v in cit.get(field, []) if '_' in v)
+                for field in ('v10', 'v16'):
+                    names.extend(a[k] for a in cit.get(field, []) for k in ('s', 'n') if k in a)
+    return titles, names
+
+
+def get_random_texts(size: int, base: list, seed=0):
+    """
+    Gera textos aleatórios com trechos de RANDOM_PIECES, combinados ou não com textos de base.
+
+    :param size: quantidade de textos
+    :param base: textos reais a serem combinados com os trechos aleatórios
+    :param seed: semente do gerador
+    :return: lista de textos
+    """
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(size):
+        pieces = [rng.choice(RANDOM_PIECES) for _ in range(rng.randint(0, 12))]
+        if base and rng.random() < 0.5:
+            pieces.insert(rng.randint(0, len(pieces)), rng.choice(base))
+        texts.append(''.join(pieces))
+    return texts
+
+
+def run(texts: list, function, repeat: int):
+    """
+    Mede o tempo para aplicar function a todos os textos.
+
+    :param texts: textos
+    :param function: função de tratamento
+    :param repeat: quantidade de repetições
+    :return: tupla (melhor tempo em segundos, resultados da última repetição)
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        results = [function(t) for t in texts]
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, results
+
+
+def compare(texts: list, reference, function, repeat: int):
+    """
+    Compara uma implementação com a de referência, quanto aos resultados e à vazão.
+
+    :param texts: textos
+    :param reference: implementação de referência
+    :param function: implementação avaliada
+    :param repeat: quantidade de repetições
+    :return: dicionário com tempos, textos por segundo, aceleração, divergências e exemplos de divergências
+    """
+    reference_time, reference_results = run(texts, reference, repeat)
+    function_time, function_results = run(texts, function, repeat)
+
+    mismatches = [t for t, r, f in zip(texts, reference_results, function_results) if r != f]
+
+    return {
+        'texts': len(texts),
+        'reference_seconds': round(reference_time, 4),
+        'fused_seconds': round(function_time, 4),
+        'reference_texts_per_second': round(len(texts) / reference_time),
+        'fused_texts_per_second': round(len(texts) / function_time),
+        'speedup': round(reference_time / function_time, 2),
+        'mismatches': len(mismatches),
+        'mismatch_examples': mismatches[:5],
+    }
+
+
+def main():
+    usage = "compare preprocess_journal_title and preprocess_author_name with their step by step reference implementations"
+
+    parser = argparse.ArgumentParser(textwrap.dedent(usage))
+
+    parser.add_argument(
+        'input',
+        nargs='*',
+        help='raw ArticleMeta documents, one JSON per line (optionally .gz or .zst), whose cited titles and names are used'
+    )
+
+    parser.add_argument(
+        '--random',
+        default=200000,
+        type=int,
+        dest='random',
+        help='number of randomly generated texts added to each corpus'
+    )
+
+    parser.add_argument(
+        '-r', '--repeat',
+        default=3,
+        type=int,
+        dest='repeat',
+        help='number of repetitions (the best time is reported)'
+    )
+
+    args = parser.parse_args()
+
+    titles, names = get_document_texts(args.input)
+    titles += get_random_texts(args.random, titles, seed=1)
+    names += get_random_texts(args.random, names, seed=2)
+
+    print(json.dumps({
+        'journal_title': compare(titles, reference_preprocess_journal_title, preprocess_journal_title, args.repeat),
+        'journal_title_invalid_chars': compare(titles,
+                                               lambda t: reference_preprocess_journal_title(t, True),
+                                               lambda t: preprocess_journal_title(t, True),
+                                               args.repeat),
+        'author_name': compare(names, reference_preprocess_author_name, preprocess_author_name, args.repeat),
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,303 @@
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import pickle
+import platform
+import random
+import resource
+import subprocess
+import tempfile
+import textwrap
+import time
+
+from benchmark.synthetic import build_correction_db, generate_citations, generate_journals
+from datetime import datetime
+from model.citation import ArticleRecord
+from model.title_index import TITLE_INDEXES
+from utils.generate_db import DB_FORMAT_EXTENSIONS
+
+
+# Etapas medidas: tratamento do título citado, normalização exata, aproximada e combinada e extração dos atributos
+# usados nas consultas ao Crossref (sem as requisições)
+MODES = ['preprocess', 'exact', 'fuzzy', 'both', 'crossref']
+
+
+def percentile(values: list, p: float):
+    """
+    Obtém o percentil p de uma lista ordenada de valores (método do valor mais próximo).
+
+    :param values: valores ordenados
+    :param p: percentil, entre 0 e 100
+    :return: valor do percentil
+    """
+    if not values:
+        return None
+    return values[min(len(values) - 1, max(0, round(p / 100 * len(values)) - 1))]
+
+
+def get_peak_rss():
+    """
+    Obtém o pico de memória residente do processo atual. No Linux, é lido de /proc/self/status (VmHWM), que, ao
+    contrário de ru_maxrss, não herda o pico do processo que criou o atual.
+
+    :return: pico de memória residente em MB
+    """
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def get_commit():
+    """
+    Obtém o commit atual do repositório, caso o pacote esteja em um repositório git.
+
+    :return: hash do commit ou None
+    """
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def get_stage(mode: str, path_db: str, fuzzy_engine: str):
+    """
+    Prepara a função medida em uma etapa.
+
+    :param mode: etapa (ver MODES)
+    :param path_db: caminho da base de correção
+    :param fuzzy_engine: motor de casamento aproximado (ver TITLE_INDEXES)
+    :return: tupla (função aplicada a cada documento, função que obtém o status de normalização de seu resultado)
+    """
+    if mode == 'preprocess':
+        from utils.string_processor import preprocess_journal_title
+        return lambda document: preprocess_journal_title(document.citations[0].source), None
+
+    if mode == 'crossref':
+        from proc.crossref import CrossrefAsyncCollector
+        collector = CrossrefAsyncCollector(email=None)
+        return collector.extract_attrs, None
+
+    from model.standardizer import Standardizer
+    sz = Standardizer(path_db, use_exact=mode in ('exact', 'both'), use_fuzzy=mode in ('fuzzy', 'both'),
+                      fuzzy_engine=fuzzy_engine)
+
+    def get_status(std_citations):
+        for v in std_citations.values():
+            return v['status']
+
+    return lambda document: sz.standardize_citations(document, {}), get_status
+
+
+def run_stage(mode: str, path_db: str, path_citations: str, fuzzy_engine: str):
+    """
+    Mede uma etapa em um processo próprio, de modo que o pico de memória seja o da etapa.
+    Cada referência citada é processada como um documento com uma única referência.
+
+    :param mode: etapa (ver MODES)
+    :param path_db: caminho da base de correção
+    :param path_citations: caminho das referências citadas sintéticas (pickle)
+    :param fuzzy_engine: motor de casamento aproximado (ver TITLE_INDEXES)
+    :return: dicionário de resultados
+    """
+    with open(path_citations, 'rb') as f:
+        citations = pickle.load(f)
+
+    documents = [ArticleRecord({'article': {'v880': [{'_': cit['v880'][0]['_'][:-5]}]},
+                                'collection': 'scl',
+                                'citations': [cit]}) for cit in citations]
+
+    start = time.perf_counter()
+    function, get_status = get_stage(mode, path_db, fuzzy_engine)
+    setup_seconds = time.perf_counter() - start
+
+    latencies = []
+    statuses = {}
+
+    start = time.perf_counter()
+    for document in documents:
+        t = time.perf_counter()
+        result = function(document)
+        latencies.append(time.perf_counter() - t)
+
+        if get_status:
+            status = get_status(result)
+            statuses[status] = statuses.get(status, 0) + 1
+    total_seconds = time.perf_counter() - start
+
+    latencies.sort()
+
+    result = {
+        'citations': len(documents),
+        'setup_seconds': round(setup_seconds, 3),
+        'seconds': round(total_seconds, 3),
+        'citations_per_second': round(len(documents) / total_seconds),
+        'p50_us': round(percentile(latencies, 50) * 1e6, 1),
+        'p99_us': round(percentile(latencies, 99) * 1e6, 1),
+        'max_us': round(latencies[-1] * 1e6, 1),
+        'peak_rss_mb': round(get_peak_rss(), 1),
+    }
+    if get_status:
+        result['status'] = {str(k): v for k, v in sorted(statuses.items(), key=lambda i: (i[0] is None, i[0] or 0))}
+
+    return result
+
+
+def main():
+    usage = "benchmark cited reference normalization on a synthetic correction database and citation stream"
+
+    parser = argparse.ArgumentParser(textwrap.dedent(usage))
+
+    parser.add_argument(
+        '-j', '--journals',
+        default=50000,
+        type=int,
+        dest='journals',
+        help='number of journals in the synthetic correction database'
+    )
+
+    parser.add_argument(
+        '-c', '--citations',
+        default=50000,
+        type=int,
+        dest='citations',
+        help='number of cited references in the synthetic stream'
+    )
+
+    parser.add_argument(
+        '--duplicate_rate',
+        default=0.3,
+        type=float,
+        dest='duplicate_rate',
+        help='share of cited references repeating the title, year and volume of a previous one'
+    )
+
+    parser.add_argument(
+        '--noise_rate',
+        default=0.3,
+        type=float,
+        dest='noise_rate',
+        help='share of cited titles with noise (case, accents, suffixes, punctuation, missing words)'
+    )
+
+    parser.add_argument(
+        '--unknown_rate',
+        default=0.1,
+        type=float,
+        dest='unknown_rate',
+        help='share of cited titles absent from the correction database'
+    )
+
+    parser.add_argument(
+        '-m', '--modes',
+        default=MODES,
+        nargs='+',
+        choices=MODES,
+        dest='modes',
+        help='stages to benchmark'
+    )
+
+    parser.add_argument(
+        '-f', '--db_format',
+        default='pickle',
+        choices=sorted(DB_FORMAT_EXTENSIONS),
+        dest='db_format',
+        help='format of the synthetic correction database (see generate_db)'
+    )
+
+    parser.add_argument(
+        '--fuzzy_engine',
+        default='prefix',
+        choices=sorted(TITLE_INDEXES),
+        dest='fuzzy_engine',
+        help='candidate generation engine for fuzzy matching'
+    )
+
+    parser.add_argument(
+        '-s', '--seed',
+        default=0,
+        type=int,
+        dest='seed',
+        help='seed of the synthetic data'
+    )
+
+    parser.add_argument(
+        '-d', '--dir',
+        default=None,
+        dest='dir',
+        help='directory of the synthetic data (a temporary directory by default); existing data is reused'
+    )
+
+    parser.add_argument(
+        '-o', '--output',
+        default=None,
+        dest='output',
+        help='JSON file where the results are written (besides the standard output)'
+    )
+
+    args = parser.parse_args()
+
+    dir_data = args.dir or tempfile.mkdtemp(prefix='benchmark-')
+    os.makedirs(dir_data, exist_ok=True)
+
+    params = {k: getattr(args, k) for k in ('journals', 'citations', 'duplicate_rate', 'noise_rate', 'unknown_rate',
+                                            'db_format', 'fuzzy_engine', 'seed')}
+
+    # Dados gerados com os mesmos parâmetros são reaproveitados
+    path_params = os.path.join(dir_data, 'params.json')
+    path_citations = os.path.join(dir_data, 'citations.pkl')
+    path_db = os.path.join(dir_data, 'bc-synthetic' + DB_FORMAT_EXTENSIONS[args.db_format])
+
+    generation = {}
+    if not os.path.exists(path_params) or json.load(open(path_params)) != params:
+        rng = random.Random(args.seed)
+
+        start = time.perf_counter()
+        journals = generate_journals(rng, args.journals)
+        build_correction_db(dir_data, journals, args.db_format, args.seed)
+        generation['db_seconds'] = round(time.perf_counter() - start, 3)
+
+        start = time.perf_counter()
+        citations = generate_citations(journals, args.citations, args.duplicate_rate, args.noise_rate,
+                                       args.unknown_rate, args.seed)
+        with open(path_citations, 'wb') as f:
+            pickle.dump(citations, f)
+        generation['citations_seconds'] = round(time.perf_counter() - start, 3)
+
+        with open(path_params, 'w') as f:
+            json.dump(params, f)
+
+    results = {
+        'commit': get_commit(),
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'params': params,
+        'generation': generation,
+        'modes': {},
+    }
+
+    # Cada etapa é executada em um processo novo (spawn), que não herda a memória das demais
+    context = multiprocessing.get_context('spawn')
+    for mode in args.modes:
+        logging.info('Running %s' % mode)
+        with context.Pool(1) as pool:
+            results['modes'][mode] = pool.apply(run_stage, (mode, path_db, path_citations, args.fuzzy_engine))
+
+    output = json.dumps(results, indent=2)
+    print(output)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,271 @@
+import csv
+import os
+import random
+
+from utils import generate_db
+
+
+# Palavras frequentes em títulos de periódicos, já no formato de preprocess_journal_title; as demais palavras do
+# vocabulário são geradas a partir de SYLLABLES
+COMMON_WORDS = ['REVISTA', 'REV', 'JOURNAL', 'J', 'OF', 'DE', 'DA', 'DO', 'THE', 'AND', 'E', 'Y', 'ACTA', 'ARCHIVES',
+                'ARQ', 'ANNALS', 'ANN', 'CADERNOS', 'CAD', 'BRASILEIRA', 'BRAS', 'INTERNATIONAL', 'INT', 'AMERICAN',
+                'AM', 'MEDICINE', 'MED', 'SAUDE', 'PUBLICA', 'CIENCIA', 'CIENC', 'RESEARCH', 'RES', 'SCIENCE', 'SCI']
+SYLLABLES = ['BA', 'BE', 'BI', 'CA', 'CO', 'CU', 'DA', 'DI', 'FA', 'FI', 'GA', 'GE', 'LA', 'LI', 'LO', 'MA', 'ME', 'MI',
+             'NA', 'NE', 'NO', 'PA', 'PE', 'PO', 'RA', 'RE', 'RI', 'SA', 'SE', 'SO', 'TA', 'TE', 'TI', 'TO', 'VA', 'VI']
+
+# Ruídos aplicados aos títulos citados, antes do tratamento por preprocess_journal_title
+NOISE_SUFFIXES = [' (Online)', ' (Impresso)', ' (Print)', ' [Internet]', '.', ' (S. Paulo)', '  ']
+
+FIRST_YEAR = 1950
+LAST_YEAR = 2023
+
+
+def issn_check_digit(digits: str):
+    """
+    Calcula o dígito verificador de um ISSN.
+
+    :param digits: sete primeiros dígitos do ISSN
+    :return: dígito verificador
+    """
+    total = sum(int(d) * w for d, w in zip(digits, range(8, 1, -1)))
+    check = (11 - total % 11) % 11
+    return 'X' if check == 10 else str(check)
+
+
+def generate_issn(rng: random.Random, used: set):
+    """
+    Gera um ISSN (sem hífen) válido e ainda não utilizado.
+
+    :param rng: gerador de números aleatórios
+    :param used: ISSNs já utilizados, atualizado com o ISSN gerado
+    :return: ISSN
+    """
+    while True:
+        digits = '%07d' % rng.randrange(10 ** 7)
+        issn = digits + issn_check_digit(digits)
+        if issn not in used:
+            used.add(issn)
+            return issn
+
+
+def generate_vocabulary(rng: random.Random, size: int):
+    """
+    Gera o vocabulário dos títulos: COMMON_WORDS seguido de palavras formadas por sílabas.
+
+    :param rng: gerador de números aleatórios
+    :param size: quantidade de palavras geradas
+    :return: lista de palavras
+    """
+    words = set(COMMON_WORDS)
+    vocabulary = list(COMMON_WORDS)
+    while len(vocabulary) < size:
+        word = ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 5)))
+        if word not in words:
+            words.add(word)
+            vocabulary.append(word)
+    return vocabulary
+
+
+def abbreviate(title: str):
+    """
+    Abrevia um título, mantendo as quatro primeiras letras de cada palavra longa.
+
+    :param title: título
+    :return: título abreviado
+    """
+    return ' '.join(w[:4] if len(w) > 5 else w for w in title.split(' '))
+
+
+def generate_journals(rng: random.Random, size: int, shared_title_rate=0.05):
+    """
+    Gera periódicos com ISSN-L, ISSNs, títulos, período de publicação e volume inicial.
+    As palavras seguem uma distribuição de Zipf, de modo que muitos títulos compartilham as primeiras palavras.
+
+    :param rng: gerador de números aleatórios
+    :param size: quantidade de periódicos
+    :param shared_title_rate: proporção de periódicos cujo título principal também é título de outro periódico
+    :return: lista de dicionários com issnl, issns, main_title, abbrev_title, alternative_titles, first_year, last_year,
+    first_volume e volumes_per_year
+    """
+    vocabulary = generate_vocabulary(rng, max(size // 2, len(COMMON_WORDS) + 1))
+    weights = [1 / (r + 1) for r in range(len(vocabulary))]
+
+    used_issns = set()
+    titles = set()
+    journals = []
+
+    for _ in range(size):
+        if journals and rng.random() < shared_title_rate:
+            title = rng.choice(journals)['main_title']
+        else:
+            while True:
+                title = ' '.join(rng.choices(vocabulary, weights, k=rng.randint(2, 7)))
+                if title not in titles:
+                    break
+        titles.add(title)
+
+        issnl = generate_issn(rng, used_issns)
+        issns = [issnl] + [generate_issn(rng, used_issns) for _ in range(rng.randint(0, 2))]
+
+        alternative_titles = [' '.join(rng.choices(vocabulary, weights, k=rng.randint(2, 6)))
+                              for _ in range(rng.randint(0, 3))]
+
+        first_year = rng.randint(FIRST_YEAR, LAST_YEAR - 1)
+
+        journals.append({
+            'issnl': issnl,
+            'issns': issns,
+            'main_title': title,
+            'abbrev_title': abbreviate(title),
+            'alternative_titles': alternative_titles,
+            'first_year': first_year,
+            'last_year': rng.randint(first_year + 1, LAST_YEAR),
+            'first_volume': rng.randint(1, 5),
+            'volumes_per_year': rng.choice([1, 1, 1, 2]),
+        })
+
+    return journals
+
+
+def get_volume(journal: dict, year: int):
+    """
+    Obtém o volume de um periódico em um ano.
+
+    :param journal: periódico (ver generate_journals)
+    :param year: ano
+    :return: volume
+    """
+    return journal['first_volume'] + journal['volumes_per_year'] * (year - journal['first_year'])
+
+
+def write_correction_tables(journals: list, dir_output: str, rng: random.Random, coverage=0.8):
+    """
+    Grava as tabelas lidas por generate_db (ISSN-L-ATRIBUTOS, ISSN-TITULO-ANO-VOLUME, ISSN-ANO-VOLUME por regressão
+    linear e equações de volume).
+
+    :param journals: periódicos (ver generate_journals)
+    :param dir_output: diretório das tabelas
+    :param rng: gerador de números aleatórios
+    :param coverage: proporção de anos de cada ISSN presentes na base ISSN-TITULO-ANO-VOLUME
+    :return: tupla com os caminhos das tabelas
+    """
+    paths = tuple(os.path.join(dir_output, name) for name in ('issnl_to_data.csv', 'issn_year_volume.csv',
+                                                             'issn_year_volume_lr.csv', 'issnl_to_equation.csv'))
+
+    with open(paths[0], 'w', newline='') as f_data, open(paths[1], 'w', newline='') as f_yv, \
+            open(paths[2], 'w', newline='') as f_lr, open(paths[3], 'w', newline='') as f_eq:
+        w_data = csv.writer(f_data, delimiter='|')
+        w_yv = csv.writer(f_yv, delimiter='|')
+        w_lr = csv.writer(f_lr, delimiter='|')
+        w_eq = csv.writer(f_eq, delimiter='|')
+
+        w_data.writerow(['ISSNL', 'MAIN_TITLE', 'MAIN_ABBREV_TITLE', 'ISSNS', 'TITLES'])
+        w_yv.writerow(['ISSN', 'TITLE', 'YEAR', 'VOLUME'])
+        w_lr.writerow(['ISSN', 'YEAR', 'ROUNDED PV', 'ROUNDED PV - 1', 'ROUNDED PV + 1'])
+        w_eq.writerow(['ISSN', 'a', 'b', 'r2'])
+
+        for j in journals:
+            w_data.writerow([j['issnl'], j['main_title'], j['abbrev_title'], '#'.join(j['issns']),
+                             '#'.join(j['alternative_titles'])])
+
+            a = j['first_volume'] - j['volumes_per_year'] * j['first_year']
+            b = j['volumes_per_year']
+
+            for issn in j['issns']:
+                w_eq.writerow([issn, a, b, round(rng.uniform(0.8, 1.0), 4)])
+
+                for year in range(j['first_year'], j['last_year'] + 1):
+                    volume = get_volume(j, year)
+                    if rng.random() < coverage:
+                        w_yv.writerow([issn[:4] + '-' + issn[4:], j['main_title'], year, volume])
+                    w_lr.writerow([issn, year, volume, volume - 1, volume + 1])
+
+    return paths
+
+
+def build_correction_db(dir_output: str, journals: list, db_format='pickle', seed=0):
+    """
+    Gera uma base de correção sintética com generate_db, a partir de tabelas gravadas em dir_output.
+
+    :param dir_output: diretório das tabelas e da base de correção
+    :param journals: periódicos (ver generate_journals)
+    :param db_format: formato da base de correção (ver generate_db.DB_FORMAT_EXTENSIONS)
+    :param seed: semente do gerador de números aleatórios
+    :return: caminho da base de correção
+    """
+    paths = write_correction_tables(journals, dir_output, random.Random(seed))
+    return generate_db.main(*paths, version='synthetic', db_format=db_format, dir_output=dir_output)
+
+
+def add_noise(rng: random.Random, title: str):
+    """
+    Aplica a um título ruídos comuns em referências citadas: caixa e acentuação diferentes, sufixos, pontuação,
+    entidades HTML e palavras omitidas.
+
+    :param rng: gerador de números aleatórios
+    :param title: título
+    :return: título com ruído
+    """
+    words = title.split(' ')
+    noise = rng.randrange(6)
+
+    if noise == 0:
+        return title.title()
+    elif noise == 1:
+        return title + rng.choice(NOISE_SUFFIXES)
+    elif noise == 2:
+        return '. '.join(words) + '.'
+    elif noise == 3:
+        return title.replace('E', '&eacute;', 1).replace('A', 'Á', 1)
+    elif noise == 4 and len(words) > 2:
+        del words[rng.randrange(1, len(words))]
+        return ' '.join(words)
+    return title.lower()
+
+
+def generate_citations(journals: list, size: int, duplicate_rate=0.3, noise_rate=0.3, unknown_rate=0.1, seed=0):
+    """
+    Gera referências citadas do tipo artigo, no formato bruto do ArticleMeta (ver model.citation.CitationRecord).
+    Os periódicos citados seguem uma distribuição de Zipf.
+
+    :param journals: periódicos (ver generate_journals)
+    :param size: quantidade de referências citadas
+    :param duplicate_rate: proporção de referências que repetem título, ano e volume de uma referência anterior
+    :param noise_rate: proporção de títulos com ruído (ver add_noise)
+    :param unknown_rate: proporção de títulos inexistentes na base de correção
+    :param seed: semente do gerador de números aleatórios
+    :return: lista de registros de referências citadas
+    """
+    rng = random.Random(seed)
+    weights = [1 / (r + 1) for r in range(len(journals))]
+    vocabulary = generate_vocabulary(rng, 1000)
+
+    citations = []
+    for c in range(size):
+        if citations and rng.random() < duplicate_rate:
+            cit = dict(rng.choice(citations))
+        else:
+            journal = rng.choices(journals, weights)[0]
+
+            if rng.random() < unknown_rate:
+                title = ' '.join(rng.choices(vocabulary, k=rng.randint(2, 6)))
+            else:
+                title = rng.choice([journal['main_title'], journal['abbrev_title']] + journal['alternative_titles'])
+
+            if rng.random() < noise_rate:
+                title = add_noise(rng, title)
+
+            year = rng.randint(journal['first_year'], journal['last_year'])
+
+            cit = {'v30': [{'_': title}], 'v65': [{'_': '%d0000' % year}]}
+
+            volume = rng.random()
+            if volume < 0.7:
+                cit['v31'] = [{'_': str(get_volume(journal, year))}]
+            elif volume < 0.8:
+                cit['v31'] = [{'_': str(get_volume(journal, year) + rng.choice([-1, 1]))}]
+
+        cit['v880'] = [{'_': 'S%010d%05d' % (c // 100, c % 100)}]
+        citations.append(cit)
+
+    return citations
@@ -0,0 +1,137 @@
+from xylose.scielodocument import html_decode
+from xylose.tools import get_date
+
+
+def get_publication_type(data: dict):
+    """
+    Obtém o tipo de publicação de uma referência citada, conforme xylose.scielodocument.Citation.
+
+    :param data: registro bruto da referência citada
+    :return: tipo de publicação
+    """
+    if 'v30' in data:
+        return 'article'
+    elif 'v53' in data:
+        return 'conference'
+    elif 'v18' in data:
+        if 'v51' in data:
+            return 'thesis'
+        else:
+            return 'book'
+    elif 'v150' in data:
+        return 'patent'
+    elif 'v37' in data:
+        return 'link'
+    else:
+        return 'undefined'
+
+
+def get_person_authors(authors: list):
+    """
+    Obtém os autores pessoa (sobrenome e prenomes) de um campo de autores, conforme xylose.scielodocument.Citation.
+
+    :param authors: lista de autores (campo v10 ou v16)
+    :return: lista de dicionários com surname e given_names
+    """
+    person_authors = []
+    for author in authors:
+        author_dict = {}
+        if 's' in author:
+            author_dict['surname'] = html_decode(author['s'])
+        if 'n' in author:
+            author_dict['given_names'] = html_decode(author['n'])
+        if author_dict:
+            person_authors.append(author_dict)
+    return person_authors
+
+
+class CitationRecord:
+    """
+    Referência citada com apenas os campos utilizados na normalização e na coleta de metadados Crossref, extraídos
+    uma única vez do registro bruto do ArticleMeta. Os valores são os mesmos das propriedades homônimas de
+    xylose.scielodocument.Citation, que são recalculadas a cada acesso.
+    """
+
+    __slots__ = ('data', 'publication_type', 'source', 'publication_date', 'volume', 'issue', 'first_page', 'doi',
+                 'first_author')
+
+    def __init__(self, data: dict):
+        self.data = data
+
+        publication_type = get_publication_type(data)
+        self.publication_type = publication_type
+
+        self.source = None
+        if publication_type == 'article' and 'v30' in data:
+            self.source = html_decode(data['v30'][0]['_'])
+        elif publication_type in ('book', 'conference') and 'v18' in data:
+            self.source = html_decode(data['v18'][0]['_'])
+
+        # Datas de tese e de conferência vazias são desconsideradas, como em Citation.publication_date
+        self.publication_date = None
+        if 'v65' in data:
+            self.publication_date = get_date(data['v65'][0]['_'])
+        elif publication_type == 'thesis' and 'v45' in data:
+            self.publication_date = get_date(data['v45'][0]['_']) or None
+        elif publication_type == 'conference' and 'v55' in data:
+            self.publication_date = get_date(data['v55'][0]['_']) or None
+
+        self.volume = None
+        if publication_type in ('article', 'book') and 'v31' in data:
+            self.volume = data['v31'][0]['_']
+
+        self.issue = None
+        if publication_type == 'article' and 'v32' in data:
+            self.issue = data['v32'][0]['_']
+
+        self.first_page = None
+        if 'v514' in data:
+            self.first_page = html_decode(data['v514'][0].get('f', None))
+        elif 'v14' in data:
+            self.first_page = html_decode(data['v14'][0]['_'].split('-')[0])
+
+        self.doi = None
+        if 'v237' in data:
+            self.doi = data['v237'][0]['_']
+
+        # Primeiro autor pessoa, entre os autores analíticos (v10) e monográficos (v16)
+        self.first_author = None
+        for field in ('v10', 'v16'):
+            if field in data:
+                authors = get_person_authors(data[field])
+                if authors:
+                    self.first_author = authors[0]
+                    break
+
+
+def get_collection_acronym(data: dict):
+    """
+    Obtém o acrônimo da coleção de um documento, conforme xylose.scielodocument.Article.
+
+    :param data: registro bruto do documento
+    :return: acrônimo da coleção
+    """
+    if 'collection' in data:
+        return data['collection']
+
+    for section in ('article', 'title'):
+        if 'v992' in data.get(section, {}):
+            v992 = data[section]['v992']
+            if isinstance(v992, list):
+                return v992[0]['_']
+            return v992
+
+
+class ArticleRecord:
+    """
+    Documento do ArticleMeta com apenas os atributos utilizados por Standardizer e CrossrefAsyncCollector
+    (publisher_id, collection_acronym e citations), em substituição a xylose.scielodocument.Article.
+    """
+
+    __slots__ = ('data', 'publisher_id', 'collection_acronym', 'citations')
+
+    def __init__(self, data: dict):
+        self.data = data
+        self.publisher_id = data['article']['v880'][0]['_']
+        self.collection_acronym = get_collection_acronym(data)
+        self.citations = [CitationRecord(c) for c in data.get('citations', [])] or None
@@ -0,0 +1,116 @@
+import sys
+
+
+def hyphenate_issn(issn: str):
+    """
+    Insere hífen no ISSN.
+
+    :param issn: ISSN sem hífen
+    :return: ISSN com hífen (ou None, se issn for vazio)
+    """
+    if issn:
+        return issn[:4] + '-' + issn[4:]
+
+
+class JournalRecord:
+    """
+    Dados de um ISSN-L na base de correção (issnl-to-data). Os campos são tuplas de strings internalizadas,
+    compartilhadas com title-to-issnl, e os ISSNs com hífen são calculados uma única vez, na construção da base.
+    """
+
+    __slots__ = ('main_title', 'main_abbrev_title', 'issns', 'alternative_titles', 'hyphenated_issn_l',
+                 'hyphenated_issns')
+
+    def __init__(self, main_title, main_abbrev_title, issns, alternative_titles, hyphenated_issn_l, hyphenated_issns):
+        self.main_title = main_title
+        self.main_abbrev_title = main_abbrev_title
+        self.issns = issns
+        self.alternative_titles = alternative_titles
+        self.hyphenated_issn_l = hyphenated_issn_l
+        self.hyphenated_issns = hyphenated_issns
+
+    def __reduce__(self):
+        return JournalRecord, (self.main_title, self.main_abbrev_title, self.issns, self.alternative_titles,
+                               self.hyphenated_issn_l, self.hyphenated_issns)
+
+
+def make_journal_record(issn_l: str, data: dict):
+    """
+    Converte os dados de um ISSN-L no formato original (dicionário de listas) em JournalRecord.
+
+    :param issn_l: ISSN-L sem hífen
+    :param data: dicionário com as chaves main-title, main-abbrev-title, issns e alternative-titles
+    :return: JournalRecord
+    """
+    intern = sys.intern
+    issns = tuple(intern(i) for i in data.get('issns', []))
+
+    return JournalRecord(main_title=tuple(intern(t) for t in data.get('main-title', [])),
+                         main_abbrev_title=tuple(intern(t) for t in data.get('main-abbrev-title', [])),
+                         issns=issns,
+                         alternative_titles=tuple(intern(t) for t in data.get('alternative-titles', [])),
+                         hyphenated_issn_l=hyphenate_issn(issn_l),
+                         hyphenated_issns=tuple(hyphenate_issn(i) for i in issns))
+
+
+def compact_journal_data(issnl_to_data: dict, title_to_issnl: dict, issn_to_issnl: dict):
+    """
+    Converte as bases issnl-to-data, title-to-issnl e issn-to-issnl para uma representação compacta: registros
+    JournalRecord, strings internalizadas compartilhadas entre as bases e tuplas (compartilhadas, no caso de um único
+    ISSN-L) no lugar de sets.
+
+    :param issnl_to_data: dicionário de ISSN-L para dados do periódico
+    :param title_to_issnl: dicionário de título para set de ISSN-Ls
+    :param issn_to_issnl: dicionário de ISSN para ISSN-L
+    :return: tupla (issnl-to-data, title-to-issnl e issn-to-issnl compactos)
+    """
+    intern = sys.intern
+
+    compact_issnl_to_data = {}
+    singletons = {}
+    for issn_l, data in issnl_to_data.items():
+        issn_l = intern(issn_l)
+        compact_issnl_to_data[issn_l] = data if isinstance(data, JournalRecord) else make_journal_record(issn_l, data)
+        singletons[issn_l] = (issn_l,)
+
+    compact_title_to_issnl = {}
+    for title, issn_ls in title_to_issnl.items():
+        if len(issn_ls) == 1:
+            issn_l = next(iter(issn_ls))
+            compact_title_to_issnl[intern(title)] = singletons.get(issn_l) or (intern(issn_l),)
+        else:
+            compact_title_to_issnl[intern(title)] = tuple(sorted(intern(i) for i in issn_ls))
+
+    compact_issn_to_issnl = {intern(issn): intern(issn_l) for issn, issn_l in issn_to_issnl.items()}
+
+    return compact_issnl_to_data, compact_title_to_issnl, compact_issn_to_issnl
+
+
+def get_deep_size(*objs):
+    """
+    Estima a memória ocupada por objetos, incluindo os objetos que eles referenciam (dicionários, sets, listas, tuplas
+    e JournalRecord). Objetos compartilhados são contados uma única vez.
+
+    :param objs: objetos a serem medidos
+    :return: tamanho em bytes
+    """
+    seen = set()
+    size = 0
+    stack = list(objs)
+
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        elif isinstance(obj, JournalRecord):
+            stack.extend(getattr(obj, a) for a in JournalRecord.__slots__)
+
+    return size
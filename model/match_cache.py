@@ -0,0 +1,163 @@
+import logging
+import os
+import sqlite3
+
+from collections import OrderedDict
+
+
+# Tempo máximo, em segundos, de espera por um lock do cache em disco mantido por outro processo
+MATCH_CACHE_BUSY_TIMEOUT = float(os.environ.get('MATCH_CACHE_BUSY_TIMEOUT', '30'))
+
+
+class LRUCache:
+    """
+    Cache de tamanho limitado que descarta as entradas usadas há mais tempo.
+    Contabiliza acertos e falhas de consulta.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __contains__(self, key):
+        return key in self.data
+
+    def __len__(self):
+        return len(self.data)
+
+    def get(self, key, default=None):
+        """
+        Obtém o valor associado a key e o marca como usado recentemente.
+
+        :param key: chave procurada
+        :param default: valor retornado caso key não esteja no cache
+        :return: valor associado a key ou default
+        """
+        try:
+            value = self.data[key]
+        except KeyError:
+            self.misses += 1
+            return default
+
+        self.data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """
+        Armazena value em key, descartando a entrada usada há mais tempo se o cache estiver cheio.
+
+        :param key: chave
+        :param value: valor
+        """
+        if self.maxsize <= 0:
+            return
+
+        self.data[key] = value
+        self.data.move_to_end(key)
+
+        if len(self.data) > self.maxsize:
+            self.data.popitem(last=False)
+
+    def info(self):
+        """
+        Obtém as estatísticas de uso do cache.
+
+        :return: dicionário com acertos, falhas, tamanho atual e tamanho máximo
+        """
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self.data), 'maxsize': self.maxsize}
+
+
+class PersistentMatchCache:
+    """
+    Cache em disco (SQLite) de resultados de casamento aproximado, válido para uma versão da base de correção.
+    Quando a versão ou a data de criação da base de correção muda, o conteúdo do cache é descartado.
+    O arquivo pode ser usado por mais de um processo (modo WAL). Consultas e escritas que falham por lock (após
+    busy_timeout segundos) são registradas no log e tratadas como falhas de consulta ou escritas descartadas.
+    """
+
+    def __init__(self, path_cache: str, db_version: str, commit_interval=1000, busy_timeout=MATCH_CACHE_BUSY_TIMEOUT):
+        self.path_cache = path_cache
+        self.db_version = db_version
+        self.commit_interval = commit_interval
+        self.pending = 0
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+        self.connection = sqlite3.connect(path_cache, timeout=busy_timeout)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+        self.connection.execute('CREATE TABLE IF NOT EXISTS fuzzy_matches (title TEXT PRIMARY KEY, issnls TEXT)')
+
+        row = self.connection.execute('SELECT value FROM meta WHERE key = ?', ('db-version', )).fetchone()
+        if not row or row[0] != db_version:
+            if row:
+                logging.info('Match cache %s was built for %s, discarding it' % (path_cache, row[0]))
+            self.connection.execute('DELETE FROM fuzzy_matches')
+            self.connection.execute('INSERT OR REPLACE INTO meta VALUES (?, ?)', ('db-version', db_version))
+        self.connection.commit()
+
+        total = self.connection.execute('SELECT COUNT(*) FROM fuzzy_matches').fetchone()[0]
+        logging.info('There are {0} titles in the match cache {1}'.format(total, path_cache))
+
+    def get(self, title: str):
+        """
+        Obtém o set de ISSN-Ls armazenado para title.
+
+        :param title: título limpo do periódico citado
+        :return: set de ISSN-Ls ou None, caso title não esteja no cache
+        """
+        try:
+            row = self.connection.execute('SELECT issnls FROM fuzzy_matches WHERE title = ?', (title, )).fetchone()
+        except sqlite3.OperationalError as e:
+            logging.warning('Could not read from the match cache %s: %s' % (self.path_cache, e))
+            self.errors += 1
+            row = None
+
+        if row is None:
+            self.misses += 1
+            return
+
+        self.hits += 1
+        return set(row[0].split('#')) if row[0] else set()
+
+    def put(self, title: str, issnls: set):
+        """
+        Armazena o set de ISSN-Ls de title. As escritas são confirmadas a cada commit_interval inserções; caso a
+        confirmação falhe, é tentada novamente na próxima inserção.
+
+        :param title: título limpo do periódico citado
+        :param issnls: set de ISSN-Ls casados
+        """
+        try:
+            self.connection.execute('INSERT OR REPLACE INTO fuzzy_matches VALUES (?, ?)', (title, '#'.join(sorted(issnls))))
+            self.pending += 1
+
+            if self.pending >= self.commit_interval:
+                self.connection.commit()
+                self.pending = 0
+        except sqlite3.OperationalError as e:
+            logging.warning('Could not write to the match cache %s: %s' % (self.path_cache, e))
+            self.errors += 1
+
+    def close(self):
+        """
+        Confirma as escritas pendentes e fecha o cache.
+        """
+        try:
+            self.connection.commit()
+        except sqlite3.OperationalError as e:
+            logging.warning('Could not write to the match cache %s: %s' % (self.path_cache, e))
+            self.errors += 1
+        self.connection.close()
+
+    def info(self):
+        """
+        Obtém as estatísticas de uso do cache.
+
+        :return: dicionário com acertos, falhas e erros de acesso ao arquivo
+        """
+        return {'hits': self.hits, 'misses': self.misses, 'errors': self.errors}
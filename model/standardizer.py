@@ -1,4 +1,3 @@
-import json
 import logging
 import os
 import pickle
@@ -6,13 +5,27 @@ import re
 import time
 
 from datetime import datetime
+from model.journal import compact_journal_data, get_deep_size, JournalRecord, make_journal_record
+from model.match_cache import LRUCache, PersistentMatchCache
+from model.title_index import TITLE_INDEXES
 from pymongo import errors, MongoClient, uri_parser
+from utils.background_writer import BackgroundWriter, PERSIST_QUEUE_SIZE
+from utils.bulk_writer import MONGO_BULK_WRITE_SIZE, MongoBulkWriter
+from utils.jsonl_writer import JSON_COMPRESSION, JSON_MAX_BYTES, JSONLWriter
+from utils.mmap_db import MmapDatabase
+from utils.packed_keys import merge_validation_bases, pack_key, PackedKeySet, unpack_issn
+from utils.packed_keys import VALIDATION_TIERS, VALIDATION_TIERS_BASE
+from utils.stage_metrics import StageMetrics
 from utils.string_processor import preprocess_journal_title
 from xylose.scielodocument import Citation
 
 
 DIR_DATA = os.environ.get('DIR_DATA', '/opt/data')
 MONGO_STDCITS_COLLECTION = os.environ.get('MONGO_STDCITS_COLLECTION', 'standardized')
+MATCH_CACHE_SIZE = int(os.environ.get('MATCH_CACHE_SIZE', '100000'))
+CITATION_CACHE_SIZE = int(os.environ.get('CITATION_CACHE_SIZE', '100000'))
+MONGO_STATUS_BATCH_SIZE = int(os.environ.get('MONGO_STATUS_BATCH_SIZE', '1000'))
+STANDARDIZE_BATCH_SIZE = int(os.environ.get('STANDARDIZE_BATCH_SIZE', '100'))
 
 MIN_CHARS_LENGTH = 6
 MIN_WORDS_COUNT = 2
@@ -45,10 +58,22 @@ class Standardizer:
                  path_db,
                  use_exact=False,
                  use_fuzzy=False,
-                 mongo_uri_std_cits=None):
+                 mongo_uri_std_cits=None,
+                 fuzzy_engine='prefix',
+                 match_cache_size=MATCH_CACHE_SIZE,
+                 path_match_cache=None,
+                 citation_cache_size=CITATION_CACHE_SIZE,
+                 mongo_batch_size=MONGO_BULK_WRITE_SIZE,
+                 async_persist=False,
+                 persist_queue_size=PERSIST_QUEUE_SIZE,
+                 json_compression=JSON_COMPRESSION,
+                 json_max_bytes=JSON_MAX_BYTES):
 
         self.use_exact = use_exact
         self.use_fuzzy = use_fuzzy
+        self.fuzzy_engine = fuzzy_engine
+        self.fuzzy_match_cache = LRUCache(match_cache_size)
+        self.citation_cache = LRUCache(citation_cache_size)
 
         if mongo_uri_std_cits:
             try:
@@ -57,6 +82,7 @@ class Standardizer:
                 if not mongo_col:
                     mongo_col = MONGO_STDCITS_COLLECTION
                 self.standardizer = MongoClient(mongo_uri_std_cits).get_database().get_collection(mongo_col)
+                self.bulk_writer = MongoBulkWriter(self.standardizer, mongo_batch_size)
 
                 total_docs = self.standardizer.count_documents({})
                 logging.info(
@@ -69,11 +95,105 @@ class Standardizer:
             self.persist_mode = 'json'
             file_name_results = 'std-results-' + str(time.time()) + '.json'
             self.path_results = os.path.join(DIR_DATA, file_name_results)
+            self.json_writer = JSONLWriter(self.path_results, json_compression, json_max_bytes)
+
+        self.persistence_sink = None
+        if async_persist:
+            self.start_async_persist(persist_queue_size)
+
+        self.title_index = None
+        self.persistent_match_cache = None
+        self.validation_tiers = None
+        self.use_packed_keys = False
 
         if path_db:
             logging.info('Loading %s' % path_db)
             self.db = self.load_database(path_db)
 
+            if self.db:
+                self.compact_title_data()
+                self.validation_tiers = self.load_validation_tiers()
+                self.use_packed_keys = self.validation_tiers is not None or all(
+                    isinstance(self.db.get(name), PackedKeySet) for _, name, _ in VALIDATION_TIERS
+                )
+
+            if self.db and self.use_fuzzy:
+                self.title_index = self.build_title_index()
+
+                if path_match_cache:
+                    self.persistent_match_cache = self.open_persistent_match_cache(path_match_cache)
+
+    def start_async_persist(self, persist_queue_size=PERSIST_QUEUE_SIZE):
+        """
+        Passa a persistir as referências citadas normalizadas em uma thread dedicada (ver persist).
+
+        :param persist_queue_size: quantidade máxima de itens aguardando persistência
+        """
+        if not self.persistence_sink:
+            self.persistence_sink = BackgroundWriter(self.save_standardized_citations, persist_queue_size)
+
+    def enable_metrics(self, metrics: StageMetrics):
+        """
+        Passa a contabilizar em metrics o tempo das etapas da normalização (limpeza de títulos, casamento exato e
+        aproximado, montagem de chaves, validação, montagem de resultados e persistência), as bases de validação que
+        validaram cada referência e os status das referências citadas persistidas.
+        O tempo de validação é contabilizado por base: com as bases separadas, cada consulta a uma base é cronometrada
+        em validation_<base>; com a base unificada (validation_tiers), todas as bases são resolvidas em uma única
+        consulta, cujo tempo é atribuído à base que validou a referência (ou a validation_failed) e também somado em
+        validation.
+        Com --workers, apenas a persistência e os status são contabilizados, no processo principal.
+
+        :param metrics: StageMetrics
+        """
+        metrics.instrument(self, {'clean_journal_title': 'title_preprocessing',
+                                  'match_exact': 'exact_match',
+                                  'match_fuzzy': 'fuzzy_match',
+                                  'extract_issn_year_volume_keys': 'key_building',
+                                  'mount_standardized_citation_data': 'result_mounting',
+                                  'save_standardized_citations': 'persistence'})
+
+        if self.persistence_sink:
+            self.persistence_sink.save_function = self.save_standardized_citations
+
+        # Com as bases de validação separadas, cada base é consultada (e cronometrada) em uma chamada de validate_match
+        validate_match = self.validate_match
+
+        def timed_validate_match(keys, use_lr=False, use_lr_ml1=False):
+            start = time.perf_counter()
+            try:
+                return validate_match(keys, use_lr, use_lr_ml1)
+            finally:
+                tier = 'lr' if use_lr else 'lr-ml1' if use_lr_ml1 else 'default'
+                metrics.add('validation_' + tier, time.perf_counter() - start)
+
+        self.validate_match = timed_validate_match
+
+        validate_match_tiers = self.validate_match_tiers
+
+        def counted_validate_match_tiers(keys):
+            start = time.perf_counter()
+            tier, valid_matches = validate_match_tiers(keys)
+            if self.validation_tiers is not None:
+                seconds = time.perf_counter() - start
+                metrics.add('validation', seconds)
+                metrics.add('validation_' + (tier or 'failed'), seconds)
+            if tier is None:
+                metrics.incr('validation_failed')
+            else:
+                metrics.incr('validated_' + tier + ('' if len(valid_matches) == 1 else '_ambiguous'))
+            return tier, valid_matches
+
+        self.validate_match_tiers = counted_validate_match_tiers
+
+        persist = self.persist
+
+        def counted_persist(std_citations):
+            metrics.count_statuses(std_citations)
+            metrics.incr('citations', len(std_citations))
+            persist(std_citations)
+
+        self.persist = counted_persist
+
     def add_hifen_issn(self, issn: str):
         """
         Insere hífen no ISSN.
@@ -87,25 +207,154 @@ class Standardizer:
     def load_database(self, path_db: str):
         """
         Carrega na memória o arquivo binário das bases de correção e validação.
+        Se path_db for um diretório gerado com generate_db --format mmap (ou sections), cada seção é lida apenas no
+        primeiro acesso; as seções necessárias para os modos de casamento em uso são lidas antecipadamente.
 
-        :param path_db: caminho do arquivo binário
+        :param path_db: caminho do arquivo binário (ou do diretório)
         :return: base carregada em formato de dicionário
         """
+        if os.path.isdir(path_db):
+            db = MmapDatabase(path_db)
+            db.load(self.get_required_sections())
+            return db
+
         try:
+            start = time.time()
             with open(path_db, 'rb') as f:
-                return pickle.load(f)
+                db = pickle.load(f)
+            logging.info('%s (%.1f MB) loaded in %.2fs' % (path_db, os.path.getsize(path_db) / 1024 ** 2,
+                                                         time.time() - start))
+            return db
         except FileNotFoundError:
             logging.error('File {0} does not exist'.format(path_db))
 
-    def extract_issnl_from_valid_match(self, valid_match: str):
+    def get_required_sections(self):
+        """
+        Obtém os nomes das seções da base de correção utilizadas pelos modos de casamento em uso.
+        A seção title-year-volume, por exemplo, não é utilizada na normalização.
+
+        :return: lista de nomes de seções
+        """
+        if not self.use_exact and not self.use_fuzzy:
+            return []
+
+        return ['title-to-issnl', 'issnl-to-data', 'issn-to-issnl', 'issn-to-equation', VALIDATION_TIERS_BASE]
+
+    def compact_title_data(self):
+        """
+        Converte para a representação compacta (JournalRecord, strings internalizadas e tuplas) as bases issnl-to-data,
+        title-to-issnl e issn-to-issnl de bases de correção geradas antes dessa representação e carregadas em memória.
+        """
+        if not isinstance(self.db, dict):
+            return
+
+        issnl_to_data = self.db.get('issnl-to-data', {})
+        if all(isinstance(v, JournalRecord) for v in issnl_to_data.values()):
+            return
+
+        logging.info('Compacting title data')
+        names = ['issnl-to-data', 'title-to-issnl', 'issn-to-issnl']
+        size_before = get_deep_size(*[self.db.get(n, {}) for n in names])
+        for name, data in zip(names, compact_journal_data(*[self.db.pop(n, {}) for n in names])):
+            self.db[name] = data
+        size_after = get_deep_size(*[self.db[n] for n in names])
+        logging.info('Title data compacted from %.1f MB to %.1f MB' % (size_before / 1024 ** 2, size_after / 1024 ** 2))
+
+    def get_journal(self, issn_l: str):
+        """
+        Obtém os dados de um ISSN-L na base issnl-to-data.
+
+        :param issn_l: ISSN-L sem hífen
+        :return: JournalRecord ou None, caso o ISSN-L não exista na base
+        """
+        data = self.db['issnl-to-data'].get(issn_l)
+        if data is None or isinstance(data, JournalRecord):
+            return data
+        return make_journal_record(issn_l, data)
+
+    def load_validation_tiers(self):
+        """
+        Obtém a base de validação unificada, que associa cada chave ISSN-ANO-VOLUME à máscara de bits das bases de
+        validação em que ocorre. Em bases de correção geradas antes da unificação e carregadas em memória, as três
+        bases de validação são unidas (e descartadas) neste momento.
+
+        :return: PackedKeyTiers ou None, caso as bases de validação estejam disponíveis apenas separadamente
+        """
+        if VALIDATION_TIERS_BASE in self.db:
+            return self.db[VALIDATION_TIERS_BASE]
+
+        if isinstance(self.db, dict) and all(name in self.db for _, name, _ in VALIDATION_TIERS):
+            logging.info('Merging validation bases')
+            self.db[VALIDATION_TIERS_BASE] = merge_validation_bases({name: self.db.pop(name) for _, name, _ in VALIDATION_TIERS})
+            return self.db[VALIDATION_TIERS_BASE]
+
+    def mount_issn_year_volume_key(self, issn: str, year: str, volume: str):
+        """
+        Monta uma chave ISSN-ANO-VOLUME. Se as bases de validação forem PackedKeySet ou PackedKeyTiers, a chave é
+        codificada em um inteiro, sempre que possível.
+
+        :param issn: ISSN sem hífen
+        :param year: ano
+        :param volume: volume
+        :return: chave codificada (int) ou no formato ISSN-ANO-VOLUME (str)
+        """
+        if self.use_packed_keys:
+            packed_key = pack_key(issn, year, volume)
+            if packed_key is not None:
+                return packed_key
+        return '-'.join([issn, year, volume])
+
+    def build_title_index(self):
+        """
+        Constrói o índice de títulos oficiais utilizado para obter candidatos no casamento aproximado.
+
+        :return: índice de títulos conforme o motor de casamento aproximado escolhido
+        """
+        logging.info('Building title index (%s)' % self.fuzzy_engine)
+        return TITLE_INDEXES[self.fuzzy_engine](self.db['title-to-issnl'])
+
+    def open_persistent_match_cache(self, path_match_cache: str):
+        """
+        Abre o cache em disco de resultados de casamento aproximado, vinculado à versão da base de correção carregada.
+
+        :param path_match_cache: caminho do arquivo de cache
+        :return: cache em disco ou None, caso a base de correção não possua versão nem data de criação
+        """
+        if not self.db.get('version') and not self.db.get('creation-date'):
+            logging.warning('Correction database has no version, match cache %s will not be used' % path_match_cache)
+            return
+
+        db_version = '{0} ({1})'.format(self.db.get('version'), self.db.get('creation-date'))
+        return PersistentMatchCache(path_match_cache, db_version)
+
+    def close(self):
+        """
+        Libera os recursos abertos pelo Standardizer, persistindo as escritas pendentes.
+        """
+        try:
+            if self.persistence_sink:
+                self.persistence_sink.close()
+        finally:
+            if self.persist_mode == 'mongo':
+                self.bulk_writer.close()
+            elif self.persist_mode == 'json':
+                self.json_writer.close()
+
+            if self.persistent_match_cache:
+                self.persistent_match_cache.close()
+
+    def extract_issnl_from_valid_match(self, valid_match):
         """
         Extrai ISSN-L a partir de uma chave ISSN-ANO-VOLUME.
         Caso o ISSN não exista no dicionário issn-to-issnl, considera o próprio ISSN como ISSN-L.
 
-        :param valid_match: chave validada no formato ISSN-ANO-VOLUME
+        :param valid_match: chave validada no formato ISSN-ANO-VOLUME (str) ou codificada (int)
         :return: ISSN-L
         """
-        issn, year, volume = valid_match.split('-')
+        if isinstance(valid_match, int):
+            issn = unpack_issn(valid_match)
+        else:
+            issn, year, volume = valid_match.split('-')
 
         issnl = self.db['issn-to-issnl'].get(issn, '')
 
@@ -120,7 +369,7 @@ class Standardizer:
 
         :param cit: referência citada
         :param issns: set de possíveis ISSNs
-        :return: set de chaves ISSN-ANO-VOLUME
+        :return: set de chaves ISSN-ANO-VOLUME (ver mount_issn_year_volume_key)
         """
         keys = set()
 
@@ -135,13 +384,13 @@ class Standardizer:
 
                 if cit_vol and cit_vol.isdigit():
                     for i in issns:
-                        keys.add('-'.join([i, cit_year, cit_vol]))
+                        keys.add(self.mount_issn_year_volume_key(i, cit_year, cit_vol))
                     return keys, VOLUME_IS_ORIGINAL
                 else:
                     for i in issns:
                         cit_vol_inferred = self.infer_volume(i, cit_year)
                         if cit_vol_inferred:
-                            keys.add('-'.join([i, cit_year, cit_vol_inferred]))
+                            keys.add(self.mount_issn_year_volume_key(i, cit_year, cit_vol_inferred))
                     return keys, VOLUME_IS_INFERRED
 
         return keys, VOLUME_NOT_USED
@@ -156,11 +405,9 @@ class Standardizer:
         possible_issns = set()
 
         for mi in matched_issnls:
-            possible_issns = possible_issns.union(
-                set(
-                    [j for j in self.db['issnl-to-data'].get(mi, {}).get('issns', [])]
-                )
-            )
+            journal = self.get_journal(mi)
+            if journal:
+                possible_issns.update(journal.issns)
 
         return possible_issns
 
@@ -225,13 +472,38 @@ class Standardizer:
         Procura journal_title de forma exata no dicionário title-to-issnl.
 
         :param journal_title: título do periódico citado
-        :return: set de ISSN-Ls associados de modo exato ao título do periódico citado
+        :return: ISSN-Ls associados de modo exato ao título do periódico citado
         """
-        return self.db['title-to-issnl'].get(journal_title, set())
+        return self.db['title-to-issnl'].get(journal_title, ())
 
     def match_fuzzy(self, journal_title: str):
         """
         Procura journal_title de forma aproximada no dicionário title-to-issnl.
+        Os resultados são mantidos em cache, pois os mesmos títulos citados se repetem com frequência.
+        Se houver cache em disco, ele é consultado antes de o casamento ser calculado.
+
+        :param journal_title: título do periódico citado
+        :return: set de ISSN-Ls associados de modo aproximado ao título do periódico citado
+        """
+        matches = self.fuzzy_match_cache.get(journal_title)
+
+        if matches is None and self.persistent_match_cache:
+            matches = self.persistent_match_cache.get(journal_title)
+            if matches is not None:
+                self.fuzzy_match_cache.put(journal_title, matches)
+
+        if matches is None:
+            matches = self._match_fuzzy(journal_title)
+            self.fuzzy_match_cache.put(journal_title, matches)
+
+            if self.persistent_match_cache:
+                self.persistent_match_cache.put(journal_title, matches)
+
+        return matches
+
+    def _match_fuzzy(self, journal_title: str):
+        """
+        Procura journal_title de forma aproximada no dicionário title-to-issnl, sem consultar o cache.
 
         :param journal_title: título do periódico citado
         :return: set de ISSN-Ls associados de modo aproximado ao título do periódico citado
@@ -248,7 +520,10 @@ class Standardizer:
             title_pattern = re.compile(pattern, re.UNICODE)
 
             # O título oficial deve iniciar com a primeira palavra do título procurado
-            for official_title in [ot for ot in self.db['title-to-issnl'].keys() if ot.startswith(words[0])]:
+            if self.title_index is None:
+                self.title_index = self.build_title_index()
+
+            for official_title in self.title_index.candidates(words):
                 if title_pattern.fullmatch(official_title):
                     matches = matches.union(self.db['title-to-issnl'][official_title])
         return matches
@@ -294,13 +569,15 @@ class Standardizer:
         if not issn_l:
             issn_l = self.extract_issnl_from_valid_match(key)
 
-        attrs = self.db['issnl-to-data'][issn_l]
+        journal = self.get_journal(issn_l)
+        if journal is None:
+            raise KeyError(issn_l)
 
-        data = {'issn-l': self.add_hifen_issn(issn_l),
-                'issn': [self.add_hifen_issn(i) for i in attrs['issns']],
-                'official-journal-title': attrs['main-title'],
-                'official-abbreviated-journal-title': attrs['main-abbrev-title'],
-                'alternative-journal-titles': attrs['alternative-titles'],
+        data = {'issn-l': journal.hyphenated_issn_l,
+                'issn': journal.hyphenated_issns,
+                'official-journal-title': journal.main_title,
+                'official-abbreviated-journal-title': journal.main_abbrev_title,
+                'alternative-journal-titles': journal.alternative_titles,
                 'status': status,
                 'update-date': datetime.now().strftime('%Y-%m-%d')
                 }
@@ -314,16 +591,11 @@ class Standardizer:
         :param std_citations: dicionário de referências citadas normalizadas
         """
         if self.persist_mode == 'json':
-            with open(self.path_results, 'a') as f:
-                json.dump(std_citations, f)
-                f.write('\n')
+            self.json_writer.write(std_citations)
 
         elif self.persist_mode == 'mongo':
             for v in std_citations.values():
-                self.standardizer.update_one(
-                    filter={'_id': v['_id']},
-                    update={'$set': v},
-                    upsert=True)
+                self.bulk_writer.upsert(v['_id'], v)
 
     def get_citation_mongo_status(self, cit_id: str):
         """
@@ -338,10 +610,29 @@ class Standardizer:
                 return cit_standardized.get('status', STATUS_NOT_NORMALIZED)
         return STATUS_NOT_NORMALIZED
 
+    def get_citations_mongo_status(self, cit_ids: list):
+        """
+        Obtém o status atual de normalização de várias referências citadas, com uma consulta a cada
+        MONGO_STATUS_BATCH_SIZE ids.
+
+        :param cit_ids: ids das referências citadas
+        :return: dicionário de id da referência citada para status atual de normalização (apenas as já persistidas)
+        """
+        cit_id_to_status = {}
+
+        if self.persist_mode == 'mongo':
+            cit_ids = list(cit_ids)
+            for i in range(0, len(cit_ids), MONGO_STATUS_BATCH_SIZE):
+                batch = cit_ids[i:i + MONGO_STATUS_BATCH_SIZE]
+                for cit_standardized in self.standardizer.find({'_id': {'$in': batch}}, {'status': 1}):
+                    cit_id_to_status[cit_standardized['_id']] = cit_standardized.get('status', STATUS_NOT_NORMALIZED)
+
+        return cit_id_to_status
+
     def validate_match(self, keys, use_lr=False, use_lr_ml1=False):
         """
         Valida chaves ISSN-ANO-VOLUME nas bases de validação
-        :param keys: chaves em formato ISSN-ANO-VOLUME
+        :param keys: chaves em formato ISSN-ANO-VOLUME ou codificadas
         :param use_lr: valida com dados de regressão linear de ISSN-ANO-VOLUME
         :param use_lr_ml1: valida com dados de regressão linear de ISSN-ANO-VOLUME mais ou menos 1
         :return: chaves validadas
@@ -349,11 +640,21 @@ class Standardizer:
         valid_matches = set()
 
         if use_lr:
-            validating_base = self.db['issn-year-volume-lr']
+            db_used = 'lr'
         elif use_lr_ml1:
-            validating_base = self.db['issn-year-volume-lr-ml1']
+            db_used = 'lr-ml1'
         else:
-            validating_base = self.db['issn-year-volume']
+            db_used = 'default'
+
+        name, bit = next((name, bit) for tier, name, bit in VALIDATION_TIERS if tier == db_used)
+
+        if self.validation_tiers is not None:
+            for k in keys:
+                if self.validation_tiers.get(k, 0) & bit:
+                    valid_matches.add(k)
+            return valid_matches
+
+        validating_base = self.db[name]
 
         for k in keys:
             if k in validating_base:
@@ -361,7 +662,62 @@ class Standardizer:
 
         return valid_matches
 
-    def _standardize(self, cit, cleaned_cit_journal_title, mode='exact'):
+    def validate_match_tiers(self, keys):
+        """
+        Valida chaves ISSN-ANO-VOLUME nas bases de validação, em ordem (padrão, regressão linear e regressão linear
+        com volume flexibilizado), até que alguma base valide ao menos uma chave. Com a base de validação unificada,
+        cada chave é consultada uma única vez.
+
+        :param keys: chaves em formato ISSN-ANO-VOLUME ou codificadas
+        :return: tupla (base de validação utilizada, chaves validadas), ou (None, set()) se nenhuma chave foi validada
+        """
+        if self.validation_tiers is None:
+            for tier, name, bit in VALIDATION_TIERS:
+                valid_matches = self.validate_match(keys, use_lr=tier == 'lr', use_lr_ml1=tier == 'lr-ml1')
+                if valid_matches:
+                    return tier, valid_matches
+            return None, set()
+
+        key_masks = []
+        all_masks = 0
+        for k in keys:
+            mask = self.validation_tiers.get(k, 0)
+            if mask:
+                key_masks.append((k, mask))
+                all_masks |= mask
+
+        for tier, name, bit in VALIDATION_TIERS:
+            if all_masks & bit:
+                return tier, {k for k, mask in key_masks if mask & bit}
+
+        return None, set()
+
+    def match(self, journal_title: str, mode='exact', batch_matches=None):
+        """
+        Procura journal_title de forma exata ou aproximada no dicionário title-to-issnl.
+
+        :param journal_title: título limpo do periódico citado
+        :param mode: mode de execução de casamento ['exact', 'fuzzy']
+        :param batch_matches: dicionário de (título, modo) para ISSN-Ls casados, compartilhado pelos documentos de um
+        lote (ver standardize_many), de modo que cada título distinto seja casado uma única vez no lote
+        :return: ISSN-Ls associados ao título do periódico citado
+        """
+        if batch_matches is not None:
+            key = (journal_title, mode)
+            if key in batch_matches:
+                return batch_matches[key]
+
+        if mode == 'fuzzy':
+            matches = self.match_fuzzy(journal_title)
+        else:
+            matches = self.match_exact(journal_title)
+
+        if batch_matches is not None:
+            batch_matches[key] = matches
+
+        return matches
+
+    def _standardize(self, cit, cleaned_cit_journal_title, mode='exact', batch_matches=None):
         """
         Processo auxiliar que realiza casamento de um título de periódico citado e valida casamentos, se houver
         mais de um. O processo de validação consiste em desambiguar os possíveis ISSN-Ls associados a um periódico
@@ -370,16 +726,15 @@ class Standardizer:
         :param cit: referência citada
         :param mode: mode de execução de casamento ['exact', 'fuzzy']
         :param cleaned_cit_journal_title: título limpo do periódico citado
+        :param batch_matches: casamentos já obtidos no lote de documentos atual (ver match)
         :return: dicionário composto por dados normalizados
         """
-        if mode == 'fuzzy':
-            matches = self.match_fuzzy(cleaned_cit_journal_title)
-        else:
-            matches = self.match_exact(cleaned_cit_journal_title)
+        matches = self.match(cleaned_cit_journal_title, mode, batch_matches)
 
         # Verifica se houve casamento com apenas com um ISSN-L e se é casamento exato
         if len(matches) == 1 and mode == 'exact':
-            return self.mount_standardized_citation_data(status=STATUS_EXACT, issn_l=matches.pop())
+            # Não altera matches, que pode pertencer à base de correção ou ao cache
+            return self.mount_standardized_citation_data(status=STATUS_EXACT, issn_l=next(iter(matches)))
 
         # Verifica se houve casamento com mais de um ISSN-L ou se é casamento aproximado e houve apenas um casamento
         elif len(matches) > 1 or (mode == 'fuzzy' and len(matches)) == 1:
@@ -391,51 +746,148 @@ class Standardizer:
                 keys, mount_mode = self.extract_issn_year_volume_keys(cit, possible_issns)
 
                 if keys:
-                    # Valida chaves na base de ano e volume
-                    cit_valid_matches = self.validate_match(keys)
+                    # Valida chaves na base de ano e volume e, se nenhuma for validada, nas bases de regressão linear
+                    db_used, cit_valid_matches = self.validate_match_tiers(keys)
 
                     if len(cit_valid_matches) == 1:
-                        status = self.get_status(mode, mount_mode, 'default')
+                        status = self.get_status(mode, mount_mode, db_used)
                         return self.mount_standardized_citation_data(status, cit_valid_matches.pop())
 
-                    elif len(cit_valid_matches) == 0:
-                        # Valida chaves na base de regressão linear
-                        cit_valid_matches = self.validate_match(keys, use_lr=True)
+    def _standardize_cached(self, cit, cleaned_cit_journal_title, mode='exact', batch_matches=None):
+        """
+        Obtém o resultado de _standardize para a referência citada, reaproveitando o resultado obtido anteriormente para
+        a mesma combinação de título limpo, data de publicação, volume e modo de casamento.
 
-                        if len(cit_valid_matches) == 1:
-                            status = self.get_status(mode, mount_mode, 'lr')
-                            return self.mount_standardized_citation_data(status, cit_valid_matches.pop())
+        :param cit: referência citada
+        :param cleaned_cit_journal_title: título limpo do periódico citado
+        :param mode: mode de execução de casamento ['exact', 'fuzzy']
+        :param batch_matches: casamentos já obtidos no lote de documentos atual (ver match)
+        :return: cópia do dicionário composto por dados normalizados
+        """
+        key = (cleaned_cit_journal_title, cit.publication_date, cit.volume, mode)
 
-                        elif len(cit_valid_matches) == 0:
-                            # Valida chaves na base de regressão linear com volume flexibilizado
-                            cit_valid_matches = self.validate_match(keys, use_lr_ml1=True)
+        # A própria chave indica ausência no cache, pois None é um resultado válido (referência não normalizada)
+        result = self.citation_cache.get(key, key)
+        if result is key:
+            result = self._standardize(cit, cleaned_cit_journal_title, mode, batch_matches)
+            self.citation_cache.put(key, result)
 
-                            if len(cit_valid_matches) == 1:
-                                status = self.get_status(mode, mount_mode, 'lr-ml1')
-                                return self.mount_standardized_citation_data(status, cit_valid_matches.pop())
+        if result:
+            return dict(result, **{'update-date': datetime.now().strftime('%Y-%m-%d')})
 
-    def standardize(self, document):
+    def get_document_citation_ids(self, document):
+        """
+        Obtém os ids das referências citadas do tipo artigo de um documento.
+
+        :param document: Article
+        :return: lista de ids das referências citadas
+        """
+        if document.citations:
+            return [self.mount_id(dc, document.collection_acronym) for dc in document.citations if dc.publication_type == 'article']
+        return []
+
+    def standardize(self, document, cit_id_to_status=None):
         """
         Normaliza referências citadas de um artigo.
         Atua de duas formas: exata e aproximada.
         Persiste resultados em arquivo JSON ou em MongoDB.
 
         :param document: Article dos quais as referências citadas serão normalizadas
+        :param cit_id_to_status: status atuais das referências citadas, obtidos previamente com get_citations_mongo_status
+        """
+        if cit_id_to_status is None:
+            cit_id_to_status = self.get_citations_mongo_status(self.get_document_citation_ids(document))
+
+        self.persist(self.standardize_citations(document, cit_id_to_status))
+
+    def standardize_many(self, documents, batch_size=STANDARDIZE_BATCH_SIZE):
+        """
+        Normaliza referências citadas de vários artigos, em lotes de batch_size documentos.
+        Em cada lote, os status atuais das referências citadas são obtidos em conjunto, cada título citado distinto é
+        limpo e casado uma única vez e os resultados são persistidos com uma única chamada.
+
+        :param documents: iterável de documentos (Article ou ArticleRecord)
+        :param batch_size: quantidade de documentos por lote
+        :return: quantidade de documentos normalizados
+        """
+        total = 0
+        batch = []
+
+        for document in documents:
+            batch.append(document)
+            if len(batch) >= batch_size:
+                total += self.standardize_batch(batch)
+                batch = []
+
+        if batch:
+            total += self.standardize_batch(batch)
+
+        return total
+
+    def standardize_batch(self, documents: list):
+        """
+        Normaliza e persiste as referências citadas de um lote de artigos (ver standardize_many).
+
+        :param documents: lista de documentos
+        :return: quantidade de documentos normalizados
+        """
+        cit_ids = [cit_id for document in documents for cit_id in self.get_document_citation_ids(document)]
+        cit_id_to_status = self.get_citations_mongo_status(cit_ids)
+
+        cleaned_titles = {}
+        batch_matches = {}
+        std_citations = {}
+
+        for document in documents:
+            logging.info('Normalizing cited references in %s ' % document.publisher_id)
+            std_citations.update(self.standardize_citations(document, cit_id_to_status, cleaned_titles, batch_matches))
+
+        self.persist(std_citations)
+
+        return len(documents)
+
+    def clean_journal_title(self, journal_title: str, cleaned_titles=None):
+        """
+        Limpa o título de um periódico citado com preprocess_journal_title.
+
+        :param journal_title: título do periódico citado
+        :param cleaned_titles: dicionário de título citado para título limpo, compartilhado pelos documentos de um lote
+        :return: título limpo
+        """
+        if cleaned_titles is None:
+            return preprocess_journal_title(journal_title)
+
+        cleaned_journal_title = cleaned_titles.get(journal_title)
+        if cleaned_journal_title is None:
+            cleaned_journal_title = preprocess_journal_title(journal_title)
+            cleaned_titles[journal_title] = cleaned_journal_title
+        return cleaned_journal_title
+
+    def standardize_citations(self, document, cit_id_to_status: dict, cleaned_titles=None, batch_matches=None):
+        """
+        Normaliza referências citadas de um artigo, sem persistir os resultados.
+
+        :param document: Article (ou ArticleRecord) dos quais as referências citadas serão normalizadas
+        :param cit_id_to_status: status atuais das referências citadas, obtidos previamente com get_citations_mongo_status
+        :param cleaned_titles: dicionário de título citado para título limpo, compartilhado pelos documentos de um lote
+        :param batch_matches: casamentos já obtidos no lote de documentos atual (ver match)
+        :return: dicionário de id da referência citada para dados normalizados
         """
         std_citations = {}
 
         if document.citations:
             for c, cit in enumerate([dc for dc in document.citations if dc.publication_type == 'article']):
                 cit_id = self.mount_id(cit, document.collection_acronym)
-                cit_current_status = self.get_citation_mongo_status(cit_id)
+                cit_current_status = cit_id_to_status.get(cit_id, STATUS_NOT_NORMALIZED)
 
                 if cit_current_status == STATUS_NOT_NORMALIZED:
-                    cleaned_cit_journal_title = preprocess_journal_title(cit.source)
+                    cleaned_cit_journal_title = self.clean_journal_title(cit.source, cleaned_titles)
 
                     if cleaned_cit_journal_title:
 
                         if self.use_exact:
-                            exact_match_result = self._standardize(cit, cleaned_cit_journal_title)
+                            exact_match_result = self._standardize_cached(cit, cleaned_cit_journal_title,
+                                                                          batch_matches=batch_matches)
                             if exact_match_result:
                                 exact_match_result.update({'_id': cit_id, 'cited-journal-title': cleaned_cit_journal_title})
                                 std_citations[cit_id] = exact_match_result
@@ -443,7 +895,8 @@ class Standardizer:
 
                         if self.use_fuzzy:
                             if cit_current_status == STATUS_NOT_NORMALIZED:
-                                fuzzy_match_result = self._standardize(cit, cleaned_cit_journal_title, mode='fuzzy')
+                                fuzzy_match_result = self._standardize_cached(cit, cleaned_cit_journal_title, mode='fuzzy',
+                                                                              batch_matches=batch_matches)
                                 if fuzzy_match_result:
                                     fuzzy_match_result.update({'_id': cit_id, 'cited-journal-title': cleaned_cit_journal_title})
                                     std_citations[cit_id] = fuzzy_match_result
@@ -456,5 +909,17 @@ class Standardizer:
                                               'update-date': datetime.now().strftime('%Y-%m-%d')}
                             std_citations[cit_id] = unmatch_result
 
+        return std_citations
+
+    def persist(self, std_citations: dict):
+        """
+        Persiste as referências citadas normalizadas de um artigo ou de um lote de artigos, em uma thread dedicada (se async_persist foi
+        informado) ou diretamente.
+
+        :param std_citations: dicionário de referências citadas normalizadas
+        """
         if std_citations:
-            self.save_standardized_citations(std_citations)
+            if self.persistence_sink:
+                self.persistence_sink.put(std_citations)
+            else:
+                self.save_standardized_citations(std_citations)
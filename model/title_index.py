@@ -0,0 +1,163 @@
+import bisect
+import re
+
+
+regex_metachars_pattern = re.compile(r'[.^$*+?{}\[\]\\|()]')
+
+
+class PrefixTitleIndex:
+    """
+    Índice de títulos oficiais agrupados pela primeira palavra.
+    Em cada grupo, os títulos são ordenados por tamanho.
+    """
+
+    def __init__(self, titles):
+        buckets = {}
+        for title in titles:
+            buckets.setdefault(title.split(' ')[0], []).append(title)
+
+        self.index = {}
+        for first_word, group in buckets.items():
+            group.sort(key=len)
+            self.index[first_word] = ([len(t) for t in group], group)
+
+        self.first_words = sorted(self.index)
+
+    def get_first_words(self, prefix: str):
+        """
+        Obtém as primeiras palavras indexadas que iniciam com prefix.
+
+        :param prefix: prefixo procurado
+        :return: gerador de primeiras palavras
+        """
+        # Um título que inicia com prefix possui primeira palavra que também inicia com prefix
+        i = bisect.bisect_left(self.first_words, prefix)
+        while i < len(self.first_words) and self.first_words[i].startswith(prefix):
+            yield self.first_words[i]
+            i += 1
+
+    def candidates(self, words: list):
+        """
+        Obtém os títulos oficiais que iniciam com a primeira palavra de words e que possuem tamanho suficiente para
+        conter todas as palavras de words.
+
+        :param words: palavras do título do periódico citado
+        :return: gerador de títulos oficiais candidatos
+        """
+        min_length = sum(len(w) for w in words)
+
+        for first_word in self.get_first_words(words[0]):
+            lengths, titles = self.index[first_word]
+            for j in range(bisect.bisect_left(lengths, min_length), len(titles)):
+                yield titles[j]
+
+
+class TokenTitleIndex(PrefixTitleIndex):
+    """
+    Índice invertido de títulos oficiais por palavra, com índice de trigramas sobre o vocabulário.
+    Uma palavra procurada casa com uma palavra indexada quando é uma substring dela, tal como no casamento por
+    expressão regular de Standardizer.match_fuzzy.
+    """
+
+    def __init__(self, titles):
+        super().__init__(titles)
+
+        self.token_to_titles = {}
+        for title in titles:
+            for token in set(title.split(' ')):
+                self.token_to_titles.setdefault(token, []).append(title)
+
+        self.vocabulary = list(self.token_to_titles)
+
+        self.trigram_to_tokens = {}
+        for t, token in enumerate(self.vocabulary):
+            for trigram in self.get_trigrams(token):
+                self.trigram_to_tokens.setdefault(trigram, []).append(t)
+
+        self.short_word_to_tokens = {}
+
+    def get_trigrams(self, word: str):
+        """
+        Obtém os trigramas de uma palavra.
+
+        :param word: palavra
+        :return: set de trigramas
+        """
+        return {word[i:i + 3] for i in range(len(word) - 2)}
+
+    def get_tokens(self, word: str):
+        """
+        Obtém as palavras do vocabulário que contêm word e a quantidade de títulos associados a elas.
+
+        :param word: palavra procurada
+        :return: tupla (lista de palavras do vocabulário, quantidade de títulos)
+        """
+        if len(word) < 3:
+            # Palavras curtas não possuem trigramas, o vocabulário é percorrido uma única vez por palavra
+            if word not in self.short_word_to_tokens:
+                tokens = [tk for tk in self.vocabulary if word in tk]
+                self.short_word_to_tokens[word] = (tokens, sum(len(self.token_to_titles[tk]) for tk in tokens))
+            return self.short_word_to_tokens[word]
+
+        postings = sorted((self.trigram_to_tokens.get(tg, []) for tg in self.get_trigrams(word)), key=len)
+        token_ids = set(postings[0])
+        for p in postings[1:]:
+            token_ids.intersection_update(p)
+            if not token_ids:
+                break
+
+        tokens = [self.vocabulary[t] for t in token_ids if word in self.vocabulary[t]]
+        return tokens, sum(len(self.token_to_titles[tk]) for tk in tokens)
+
+    def is_in_order(self, title: str, words: list):
+        """
+        Verifica se as palavras de words ocorrem em title, na ordem e sem sobreposição.
+
+        :param title: título oficial
+        :param words: palavras do título do periódico citado
+        :return: True se as palavras ocorrem em ordem, False caso contrário
+        """
+        position = 0
+        for w in words:
+            position = title.find(w, position)
+            if position == -1:
+                return False
+            position += len(w)
+        return True
+
+    def candidates(self, words: list):
+        """
+        Obtém os títulos oficiais que iniciam com a primeira palavra de words e que contêm as demais palavras, na ordem.
+
+        :param words: palavras do título do periódico citado
+        :return: gerador de títulos oficiais candidatos
+        """
+        # Palavras com metacaracteres de expressão regular não equivalem a substrings
+        if any(regex_metachars_pattern.search(w) for w in words):
+            yield from super().candidates(words)
+            return
+
+        # Usa as listas de títulos da palavra mais seletiva; as demais palavras são verificadas em ordem
+        selected_tokens = None
+        selected_size = sum(len(self.index[fw][1]) for fw in self.get_first_words(words[0]))
+        for w in {w for w in words[1:] if w}:
+            tokens, size = self.get_tokens(w)
+            if not size:
+                return
+            if size < selected_size:
+                selected_tokens, selected_size = tokens, size
+
+        if selected_tokens is None:
+            titles = super().candidates(words)
+        else:
+            titles = {t for tk in selected_tokens for t in self.token_to_titles[tk]}
+
+        for title in titles:
+            if title.startswith(words[0]) and self.is_in_order(title, words):
+                yield title
+
+
+TITLE_INDEXES = {
+    'prefix': PrefixTitleIndex,
+    'token': TokenTitleIndex,
+}
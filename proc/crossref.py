@@ -1,7 +1,6 @@
 import argparse
 import asyncio
 import html
-import json
 import logging
 import os
 import textwrap
@@ -13,7 +12,14 @@ from articlemeta.client import RestfulClient
 from datetime import datetime
 from json import JSONDecodeError
 from pyexpat import ExpatError
+from model.citation import ArticleRecord
 from pymongo import errors, MongoClient, uri_parser
+from utils.articlemeta_async import ARTICLEMETA_CONCURRENCY
+from utils.bulk_writer import MONGO_BULK_WRITE_SIZE, MongoBulkWriter
+from utils.document_dump import dump_documents, get_file_sources
+from utils.document_prefetcher import DocumentPrefetcher, FETCH_QUEUE_SIZE, FETCH_THREADS, get_articlemeta_sources
+from utils.jsonl_writer import COMPRESSION_EXTENSIONS, JSON_COMPRESSION, JSON_MAX_BYTES, JSONLWriter
+from utils.stage_metrics import METRICS_FORMATS, METRICS_INTERVAL, StageMetrics
 from utils.string_processor import preprocess_author_name, preprocess_doi, preprocess_journal_title
 from xylose.scielodocument import Article, Citation
 
@@ -25,14 +31,21 @@ CROSSREF_URL_WORKS = os.environ.get('CROSSREF_URL_WORKS', 'https://api.crossref.
 CROSSREF_URL_OPENURL = os.environ.get('CROSSREF_URL_OPENURL', 'https://doi.crossref.org/openurl?')
 CROSSREF_SEMAPHORE_LIMIT = int(os.environ.get('CROSSREF_SEMAPHORE_LIMIT', '20'))
 
+CROSSREF_METRICS_PREFIX = 'crossref_collector'
+
 
 class CrossrefAsyncCollector(object):
 
     logging.basicConfig(level=logging.INFO)
 
-    def __init__(self, email: None, mongo_uri_std_cits=None):
+    def __init__(self, email: None, mongo_uri_std_cits=None, mongo_batch_size=MONGO_BULK_WRITE_SIZE,
+                 json_compression=JSON_COMPRESSION, json_max_bytes=JSON_MAX_BYTES, metrics=None):
         self.email = email
 
+        # Métricas das requisições (ver record_request); None as desativa
+        self.metrics = metrics
+        self.in_flight = 0
+
         if mongo_uri_std_cits:
             try:
                 self.persist_mode = 'mongo'
@@ -40,6 +53,7 @@ class CrossrefAsyncCollector(object):
                 if not mongo_col:
                     mongo_col = MONGO_STDCITS_COLLECTION
                 self.standardizer = MongoClient(mongo_uri_std_cits).get_database().get_collection(mongo_col)
+                self.bulk_writer = MongoBulkWriter(self.standardizer, mongo_batch_size)
 
                 total_docs = self.standardizer.count_documents({})
                 logging.info('There are {0} documents in the collection {1}'.format(total_docs, mongo_col))
@@ -51,12 +65,13 @@ class CrossrefAsyncCollector(object):
             self.persist_mode = 'json'
             file_name_results = 'crossref-results-' + str(time.time()) + '.json'
             self.path_results = os.path.join(DIR_DATA, file_name_results)
+            self.json_writer = JSONLWriter(self.path_results, json_compression, json_max_bytes)
 
     def extract_attrs(self, article: Article):
         """
         Extrai os atributos de todas as referências citadas de um documento.
 
-        :param article: documento do qual serão extraídos os atributos das referências citadas
+        :param article: documento (Article ou ArticleRecord) do qual serão extraídos os atributos das referências citadas
         :return: dicionário de ids de citações e respectivos atributos
         """
         cit_id_to_attrs = {}
@@ -193,22 +208,58 @@ class CrossrefAsyncCollector(object):
         :param id_to_metadata: dicionário com id da referência citada e seus respectivos metadados Crossref
         """
         if self.persist_mode == 'json':
-            with open(self.path_results, 'a') as f:
-                json.dump(id_to_metadata, f)
-                f.write('\n')
+            self.json_writer.write(id_to_metadata)
 
         elif self.persist_mode == 'mongo':
-            self.standardizer.update_one(filter={'_id': id_to_metadata['_id']},
-                                  update={'$set': {
-                                      'crossref': id_to_metadata['crossref'],
-                                      'update-date': datetime.now().strftime('%Y-%m-%d')
-                                  }},
-                                  upsert=True)
+            self.bulk_writer.upsert(id_to_metadata['_id'], {
+                'crossref': id_to_metadata['crossref'],
+                'update-date': datetime.now().strftime('%Y-%m-%d')
+            })
+
+    def close(self):
+        """
+        Persiste as escritas pendentes.
+        """
+        if self.persist_mode == 'mongo':
+            self.bulk_writer.close()
+        elif self.persist_mode == 'json':
+            self.json_writer.close()
+
+    def record_request(self, mode: str, outcome: str, seconds: float, size=0, http_status=None):
+        """
+        Contabiliza uma requisição ao Crossref nas métricas: quantidade por modo, resultado e código HTTP, latência por
+        modo (doi, endpoint WORKS; attrs, endpoint OPENURL) e por classe de exceção, e bytes recebidos.
+
+        :param mode: modo da requisição (doi ou attrs)
+        :param outcome: resultado (success, empty ou nome da classe da exceção)
+        :param seconds: duração da requisição
+        :param size: quantidade de bytes recebidos
+        :param http_status: código HTTP da resposta, quando houver
+        """
+        metrics = self.metrics
+
+        metrics.incr(mode + '_requests')
+        if outcome in ('success', 'empty'):
+            metrics.incr('{0}_{1}'.format(mode, outcome))
+        else:
+            metrics.incr('{0}_error_{1}'.format(mode, outcome))
+            metrics.observe('error_' + outcome, seconds)
+        if http_status is not None:
+            metrics.incr('{0}_http_{1}'.format(mode, http_status))
+        if size:
+            metrics.incr('bytes_received', size)
+
+        metrics.observe(mode, seconds)
 
     async def run(self, citations_attrs: dict):
         sem = asyncio.Semaphore(CROSSREF_SEMAPHORE_LIMIT)
         tasks = []
 
+        if self.metrics:
+            self.metrics.set_gauge('semaphore_limit', CROSSREF_SEMAPHORE_LIMIT)
+            self.metrics.set_gauge('max_in_flight', 0)
+            self.metrics.incr('citations', len(citations_attrs))
+
         async with ClientSession(headers={'mailto:': self.email}) as session:
             for cit_id, attrs in citations_attrs.items():
                 if 'doi' in attrs:
@@ -231,15 +282,42 @@ class CrossrefAsyncCollector(object):
             await responses
 
     async def bound_fetch(self, cit_id, url, semaphore, session, mode):
+        if not self.metrics:
+            async with semaphore:
+                await self.fetch(cit_id, url, session, mode)
+            return
+
+        start = time.perf_counter()
         async with semaphore:
-            await self.fetch(cit_id, url, session, mode)
+            self.metrics.observe('semaphore_wait', time.perf_counter() - start)
+
+            self.in_flight += 1
+            self.metrics.set_gauge('in_flight', self.in_flight)
+            if self.in_flight > self.metrics.gauges['max_in_flight']:
+                self.metrics.set_gauge('max_in_flight', self.in_flight)
+
+            try:
+                await self.fetch(cit_id, url, session, mode)
+            finally:
+                self.in_flight -= 1
+                self.metrics.set_gauge('in_flight', self.in_flight)
 
     async def fetch(self, cit_id, url, session, mode):
+        start = time.perf_counter()
+        outcome = None
+        size = 0
+        http_status = None
+        metadata = None
+
         try:
             async with session.get(url) as response:
+                http_status = response.status
                 try:
                     logging.info('Collecting metadata for %s' % cit_id)
 
+                    # O corpo é lido antes da conversão (que o reutiliza) para contabilizar os bytes recebidos
+                    size = len(await response.read())
+
                     if mode == 'doi':
                         raw_metadata = await response.json(content_type=None)
                         if raw_metadata:
@@ -250,27 +328,40 @@ class CrossrefAsyncCollector(object):
                         if raw_metadata:
                             metadata = self.parse_crossref_openurl_result(raw_metadata)
 
+                    outcome = 'success' if metadata else 'empty'
                     if metadata:
                         id_to_metadata = {'_id': cit_id, 'crossref': metadata}
                         self.save_crossref_metadata(id_to_metadata)
                 except JSONDecodeError as e:
+                    outcome = type(e).__name__
                     logging.warning('JSONDecodeError: %s' % cit_id)
                     logging.warning(e)
                 except TimeoutError as e:
+                    outcome = type(e).__name__
                     logging.warning('TimeoutError [INNER]: %s' % cit_id)
                     logging.warning(e)
         except ContentTypeError as e:
+            outcome = type(e).__name__
             logging.warning('ContentTypeError: %s' % cit_id)
             logging.warning(e)
         except ServerDisconnectedError as e:
+            outcome = type(e).__name__
             logging.warning('ServerDisconnectedError: %s' % cit_id)
             logging.warning(e)
         except TimeoutError as e:
+            outcome = type(e).__name__
             logging.warning('TimeoutError [OUTER]: %s' % cit_id)
             logging.warning(e)
         except ClientConnectorError as e:
+            outcome = type(e).__name__
             logging.warning('ClientConectorError: %s' % cit_id)
             logging.warning(e)
+        except BaseException as e:
+            outcome = type(e).__name__
+            raise
+        finally:
+            if self.metrics:
+                self.record_request(mode, outcome, time.perf_counter() - start, size, http_status)
 
 
 def format_date(date: datetime):
@@ -313,6 +404,81 @@ def main():
         help='collect metadata for cited for the cited references in a PID (document)'
     )
 
+    parser.add_argument(
+        '--input',
+        default=None,
+        nargs='+',
+        dest='input',
+        help='read raw ArticleMeta documents (one JSON per line, optionally .gz or .zst) from these files instead of '
+             'ArticleMeta; --col, --from_date and --until_date are not applied'
+    )
+
+    parser.add_argument(
+        '--dump_documents',
+        default=None,
+        dest='dump_documents',
+        help='write the documents read into this file (one JSON per line, compressed if it ends with .gz or .zst), '
+             'which can be read later with --input'
+    )
+
+    parser.add_argument(
+        '--light_citations',
+        default=False,
+        dest='light_citations',
+        action='store_true',
+        help='extract only the cited reference fields used here from each document (ArticleRecord), '
+             'instead of building xylose objects'
+    )
+
+    parser.add_argument(
+        '--async_articlemeta',
+        default=False,
+        dest='async_articlemeta',
+        action='store_true',
+        help='fetch identifier pages and documents from ArticleMeta concurrently (aiohttp)'
+    )
+
+    parser.add_argument(
+        '--articlemeta_concurrency',
+        default=ARTICLEMETA_CONCURRENCY,
+        type=int,
+        dest='articlemeta_concurrency',
+        help='maximum number of simultaneous ArticleMeta requests when --async_articlemeta is used (requests are '
+             'still spaced by ARTICLEMETA_MIN_INTERVAL seconds)'
+    )
+
+    parser.add_argument(
+        '--fetch_threads',
+        default=FETCH_THREADS,
+        type=int,
+        dest='fetch_threads',
+        help='number of threads that fetch documents from ArticleMeta while cited references are processed (0, the default, fetches them synchronously)'
+    )
+
+    parser.add_argument(
+        '--fetch_queue_size',
+        default=FETCH_QUEUE_SIZE,
+        type=int,
+        dest='fetch_queue_size',
+        help='maximum number of fetched documents waiting to be processed'
+    )
+
+    parser.add_argument(
+        '--json_compression',
+        default=JSON_COMPRESSION or None,
+        dest='json_compression',
+        choices=sorted(COMPRESSION_EXTENSIONS),
+        help='compress the JSON results file (when no mongo uri is given)'
+    )
+
+    parser.add_argument(
+        '--json_max_bytes',
+        default=JSON_MAX_BYTES,
+        type=int,
+        dest='json_max_bytes',
+        help='split the JSON results file into numbered parts of at most this many (uncompressed) bytes; 0 disables it'
+    )
+
     parser.add_argument(
         '--mongo_uri',
         default=None,
@@ -320,6 +486,31 @@ def main():
         help='mongo uri string in the format mongodb://[username:password@]host1[:port1][,...hostN[:portN]][/[defaultauthdb][?options]]'
     )
 
+    parser.add_argument(
+        '--metrics',
+        default=None,
+        dest='metrics',
+        help='write, periodically and at the end, Crossref request counters per mode, outcome and HTTP status, latency '
+             'histograms per mode and exception class, semaphore wait time, requests in flight and bytes received to '
+             'this file'
+    )
+
+    parser.add_argument(
+        '--metrics_format',
+        default='json',
+        choices=METRICS_FORMATS,
+        dest='metrics_format',
+        help='format of the metrics file (prometheus writes a node_exporter textfile)'
+    )
+
+    parser.add_argument(
+        '--metrics_interval',
+        default=METRICS_INTERVAL,
+        type=int,
+        dest='metrics_interval',
+        help='seconds between writes of the metrics file (0 writes it only at the end)'
+    )
+
     parser.add_argument(
         '-e', '--email',
         required=True,
@@ -330,10 +521,24 @@ def main():
 
     args = parser.parse_args()
 
+    prefetcher = None
+    metrics = None
+
     try:
 
+        if args.metrics:
+            metrics = StageMetrics(args.metrics, args.metrics_format, args.metrics_interval,
+                                   prefix=CROSSREF_METRICS_PREFIX)
+
         art_meta = RestfulClient()
-        cac = CrossrefAsyncCollector(email=args.email, mongo_uri_std_cits=args.mongo_uri_std_cits)
+        cac = CrossrefAsyncCollector(email=args.email,
+                                     mongo_uri_std_cits=args.mongo_uri_std_cits,
+                                     json_compression=args.json_compression,
+                                     json_max_bytes=args.json_max_bytes,
+                                     metrics=metrics)
+
+        if metrics:
+            metrics.instrument(cac, {'extract_attrs': 'extract_attrs'})
 
         cit_ids_to_attrs = {}
 
@@ -349,18 +554,53 @@ def main():
         else:
             logging.info('Running in many PIDs mode')
 
-            for document in art_meta.documents(collection=args.col,
-                                               from_date=format_date(args.from_date),
-                                               until_date=format_date(args.until_date)):
+            if args.input:
+                sources = get_file_sources(args.input)
+            else:
+                sources = get_articlemeta_sources(collection=args.col,
+                                                  from_date=format_date(args.from_date),
+                                                  until_date=format_date(args.until_date),
+                                                  threads=args.fetch_threads,
+                                                  concurrency=args.articlemeta_concurrency if args.async_articlemeta else 0)
+
+            if args.fetch_threads > 0:
+                prefetcher = DocumentPrefetcher(sources, threads=args.fetch_threads, maxsize=args.fetch_queue_size)
+                documents = prefetcher
+            else:
+                documents = (document for source in sources for document in source())
+
+            if args.dump_documents:
+                documents = dump_documents(documents, args.dump_documents)
+
+            if args.light_citations:
+                documents = (ArticleRecord(document.data) for document in documents)
+
+            if metrics:
+                documents = metrics.timed_iter(documents)
+
+            for document in documents:
                 logging.info('Extracting info from cited references in %s ' % document.publisher_id)
                 cit_ids_to_attrs.update(cac.extract_attrs(document))
 
+            if prefetcher:
+                logging.info('Document prefetcher: {documents} documents, fetch threads waited {producer_wait:.1f}s on a full queue, '
+                             'processing waited {consumer_wait:.1f}s on an empty queue'.format(**prefetcher.info()))
+
         loop = asyncio.get_event_loop()
         future = asyncio.ensure_future(cac.run(cit_ids_to_attrs))
         loop.run_until_complete(future)
+        cac.close()
 
         end_time = time.time()
         logging.info('Duration {0} seconds.'.format(end_time - start_time))
 
     except KeyboardInterrupt:
         print("Interrupt by user")
+
+    finally:
+        if prefetcher:
+            prefetcher.close()
+
+        if metrics:
+            metrics.write()
+            metrics.log_summary()
@@ -1,17 +1,31 @@
 import argparse
+import gc
 import logging
+import multiprocessing
 import os
 import textwrap
 
 from articlemeta.client import RestfulClient
 from datetime import datetime
-from model.standardizer import Standardizer
+from model.citation import ArticleRecord
+from model.standardizer import CITATION_CACHE_SIZE, MATCH_CACHE_SIZE, STANDARDIZE_BATCH_SIZE, Standardizer
+from model.title_index import TITLE_INDEXES
 from time import time
+from utils.articlemeta_async import ARTICLEMETA_CONCURRENCY
+from utils.background_writer import PERSIST_QUEUE_SIZE
+from utils.document_dump import dump_documents, get_file_sources
+from utils.document_prefetcher import DocumentPrefetcher, FETCH_QUEUE_SIZE, FETCH_THREADS, get_articlemeta_sources
+from utils.jsonl_writer import COMPRESSION_EXTENSIONS, JSON_COMPRESSION, JSON_MAX_BYTES
+from utils.stage_metrics import METRICS_FORMATS, METRICS_INTERVAL, StageMetrics
 
 
 DIR_DATA = os.environ.get('DIR_DATA', '/opt/data')
 MONGO_DATABASE_NAME = os.environ.get('MONGO_DATABASE_NAME', 'citations')
 MONGO_COLLECTION_NAME = os.environ.get('MONGO_COLLECTION_NAME', 'standardized')
+WORKERS_CHUNK_SIZE = int(os.environ.get('WORKERS_CHUNK_SIZE', '10'))
+
+# Standardizer herdado (fork) pelos processos de trabalho de --workers
+worker_standardizer = None
 
 
 def format_date(date: datetime):
@@ -36,6 +50,69 @@ def get_execution_mode(use_exact, use_fuzzy):
     return ' - '.join(info)
 
 
+def init_worker():
+    """
+    Prepara o Standardizer herdado por um processo de trabalho. O cache de casamentos em disco (SQLite) não pode ser
+    compartilhado entre processos e é, portanto, desativado nos processos de trabalho (--match_cache não é aceito com
+    --workers).
+    """
+    worker_standardizer.persistent_match_cache = None
+
+
+def standardize_in_worker(task):
+    """
+    Normaliza, em um processo de trabalho, as referências citadas de um documento.
+
+    :param task: tupla (documento, status atuais das referências citadas)
+    :return: dicionário de referências citadas normalizadas
+    """
+    document, cit_id_to_status = task
+    return worker_standardizer.standardize_citations(document, cit_id_to_status)
+
+
+def create_worker_pool(sz: Standardizer, workers: int):
+    """
+    Cria (fork) os processos de trabalho após o carregamento da base de correção, cujas páginas de memória são
+    compartilhadas (copy-on-write ou mmap) pelos processos.
+    Deve ser chamada antes de iniciar threads no processo principal (obtenção antecipada de documentos e persistência
+    assíncrona), pois locks mantidos por elas no momento do fork seriam copiados travados para os processos filhos. O
+    cliente MongoDB, já criado, não é utilizado pelos processos de trabalho.
+
+    :param sz: Standardizer com a base de correção carregada
+    :param workers: quantidade de processos
+    :return: multiprocessing.Pool
+    """
+    global worker_standardizer
+    worker_standardizer = sz
+
+    # Objetos já existentes (a base de correção) deixam de ser percorridos pelo coletor de lixo, o que evita que suas
+    # páginas sejam copiadas nos processos filhos
+    gc.freeze()
+
+    return multiprocessing.get_context('fork').Pool(workers, initializer=init_worker)
+
+
+def standardize_in_workers(sz: Standardizer, documents, pool):
+    """
+    Normaliza documentos nos processos de trabalho (ver create_worker_pool). O processo principal obtém os documentos
+    e os status atuais das referências citadas e persiste os resultados devolvidos pelos processos.
+
+    :param sz: Standardizer com a base de correção carregada
+    :param documents: iterável de documentos (Article)
+    :param pool: processos de trabalho
+    """
+    def get_tasks():
+        for document in documents:
+            logging.info('Normalizing cited references in %s ' % document.publisher_id)
+            yield document, sz.get_citations_mongo_status(sz.get_document_citation_ids(document))
+
+    for std_citations in pool.imap_unordered(standardize_in_worker, get_tasks(), WORKERS_CHUNK_SIZE):
+        sz.persist(std_citations)
+
+    pool.close()
+    pool.join()
+
+
 def main():
     usage = "normalize cited references"
 
@@ -74,14 +151,12 @@ def main():
         '-d', '--database',
         dest='db',
         default=os.path.join(DIR_DATA, 'bc.bin'),
-        help='binary file containing a dictionary composed of five bases: '
+        help='binary file (or directory generated with generate_db --format mmap or sections) containing a dictionary composed of five bases: '
              'title-to-issnl, '
              'issnl-to-issns, '
              'issnl-to-data, '
              'title-year-volume, '
-             'issn-year-volume, '
-             'issn-year-volume-lr, '
-             'issn-year-volume-lr-ml1, '
+             'issn-year-volume-tiers (or issn-year-volume, issn-year-volume-lr and issn-year-volume-lr-ml1), '
              'issn-to-equation'
     )
 
@@ -93,6 +168,39 @@ def main():
         help='use fuzzy match techniques'
     )
 
+    parser.add_argument(
+        '--fuzzy_engine',
+        default='prefix',
+        dest='fuzzy_engine',
+        choices=sorted(TITLE_INDEXES),
+        help='index used to select candidate titles in fuzzy match techniques'
+    )
+
+    parser.add_argument(
+        '--match_cache_size',
+        default=MATCH_CACHE_SIZE,
+        type=int,
+        dest='match_cache_size',
+        help='maximum number of cited journal titles whose fuzzy match results are kept in memory (0 disables the cache)'
+    )
+
+    parser.add_argument(
+        '--citation_cache_size',
+        default=CITATION_CACHE_SIZE,
+        type=int,
+        dest='citation_cache_size',
+        help='maximum number of (cited journal title, year, volume, match mode) results kept in memory (0 disables the cache)'
+    )
+
+    parser.add_argument(
+        '--match_cache',
+        default=None,
+        dest='match_cache',
+        help='SQLite file in which fuzzy match results are kept across runs (e.g. %s); '
+             'it is reset when the correction database version changes; not available with --workers'
+             % os.path.join(DIR_DATA, 'match-cache.db')
+    )
+
     parser.add_argument(
         '-x', '--use_exact',
         default=False,
@@ -101,6 +209,138 @@ def main():
         help='use exact match techniques'
     )
 
+    parser.add_argument(
+        '--input',
+        default=None,
+        nargs='+',
+        dest='input',
+        help='read raw ArticleMeta documents (one JSON per line, optionally .gz or .zst) from these files instead of '
+             'ArticleMeta; --col, --from_date and --until_date are not applied'
+    )
+
+    parser.add_argument(
+        '--dump_documents',
+        default=None,
+        dest='dump_documents',
+        help='write the documents read into this file (one JSON per line, compressed if it ends with .gz or .zst), '
+             'which can be read later with --input'
+    )
+
+    parser.add_argument(
+        '--light_citations',
+        default=False,
+        dest='light_citations',
+        action='store_true',
+        help='extract only the cited reference fields used here from each document (ArticleRecord), '
+             'instead of building xylose objects'
+    )
+
+    parser.add_argument(
+        '--async_articlemeta',
+        default=False,
+        dest='async_articlemeta',
+        action='store_true',
+        help='fetch identifier pages and documents from ArticleMeta concurrently (aiohttp)'
+    )
+
+    parser.add_argument(
+        '--articlemeta_concurrency',
+        default=ARTICLEMETA_CONCURRENCY,
+        type=int,
+        dest='articlemeta_concurrency',
+        help='maximum number of simultaneous ArticleMeta requests when --async_articlemeta is used (requests are '
+             'still spaced by ARTICLEMETA_MIN_INTERVAL seconds)'
+    )
+
+    parser.add_argument(
+        '--fetch_threads',
+        default=FETCH_THREADS,
+        type=int,
+        dest='fetch_threads',
+        help='number of threads that fetch documents from ArticleMeta while cited references are processed (0, the default, fetches them synchronously)'
+    )
+
+    parser.add_argument(
+        '--fetch_queue_size',
+        default=FETCH_QUEUE_SIZE,
+        type=int,
+        dest='fetch_queue_size',
+        help='maximum number of fetched documents waiting to be processed'
+    )
+
+    parser.add_argument(
+        '--workers',
+        default=1,
+        type=int,
+        dest='workers',
+        help='number of processes that normalize documents in parallel, sharing the correction database loaded once '
+             '(cannot be used with --match_cache)'
+    )
+
+    parser.add_argument(
+        '--batch_size',
+        default=STANDARDIZE_BATCH_SIZE,
+        type=int,
+        dest='batch_size',
+        help='number of documents normalized together: each distinct cited title is cleaned and matched once per batch '
+             'and results are persisted once per batch (ignored with --workers)'
+    )
+
+    parser.add_argument(
+        '--async_persist',
+        default=False,
+        dest='async_persist',
+        action='store_true',
+        help='persist standardized citations in a background thread, overlapping matching and I/O'
+    )
+
+    parser.add_argument(
+        '--persist_queue_size',
+        default=PERSIST_QUEUE_SIZE,
+        type=int,
+        dest='persist_queue_size',
+        help='maximum number of documents (or batches, see --batch_size) waiting to be persisted when --async_persist is used'
+    )
+
+    parser.add_argument(
+        '--json_compression',
+        default=JSON_COMPRESSION or None,
+        dest='json_compression',
+        choices=sorted(COMPRESSION_EXTENSIONS),
+        help='compress the JSON results file (when no mongo uri is given)'
+    )
+
+    parser.add_argument(
+        '--json_max_bytes',
+        default=JSON_MAX_BYTES,
+        type=int,
+        dest='json_max_bytes',
+        help='split the JSON results file into numbered parts of at most this many (uncompressed) bytes; 0 disables it'
+    )
+
+    parser.add_argument(
+        '--metrics',
+        default=None,
+        dest='metrics',
+        help='write per-stage timings, counters and a status histogram to this file, periodically and at exit'
+    )
+
+    parser.add_argument(
+        '--metrics_format',
+        default='json',
+        dest='metrics_format',
+        choices=METRICS_FORMATS,
+        help='format of the metrics file (prometheus writes a node_exporter textfile)'
+    )
+
+    parser.add_argument(
+        '--metrics_interval',
+        default=METRICS_INTERVAL,
+        type=int,
+        dest='metrics_interval',
+        help='seconds between metrics file updates (0 writes it only at exit)'
+    )
+
     parser.add_argument(
         '--mongo_uri',
         default=None,
@@ -110,15 +350,44 @@ def main():
 
     args = parser.parse_args()
 
+    if args.workers > 1 and args.match_cache:
+        parser.error('--match_cache cannot be used with --workers (the worker processes do not share the SQLite cache)')
+
+    sz = None
+    prefetcher = None
+    metrics = None
+    pool = None
+
     try:
 
         sz = Standardizer(
             path_db=args.db,
             use_exact=args.use_exact,
             use_fuzzy=args.use_fuzzy,
-            mongo_uri_std_cits=args.mongo_uri_std_cits
+            mongo_uri_std_cits=args.mongo_uri_std_cits,
+            fuzzy_engine=args.fuzzy_engine,
+            match_cache_size=args.match_cache_size,
+            path_match_cache=args.match_cache,
+            citation_cache_size=args.citation_cache_size,
+            async_persist=args.async_persist and args.workers <= 1,
+            persist_queue_size=args.persist_queue_size,
+            json_compression=args.json_compression,
+            json_max_bytes=args.json_max_bytes
         )
 
+        # Os processos de trabalho são criados antes de qualquer thread (persistência assíncrona e obtenção antecipada
+        # de documentos)
+        if args.workers > 1 and not args.pid and (sz.use_exact or sz.use_fuzzy):
+            logging.info('Running with %d workers' % args.workers)
+            pool = create_worker_pool(sz, args.workers)
+
+        if args.async_persist:
+            sz.start_async_persist(args.persist_queue_size)
+
+        if args.metrics:
+            metrics = StageMetrics(args.metrics, args.metrics_format, args.metrics_interval)
+            sz.enable_metrics(metrics)
+
         art_meta = RestfulClient()
 
         if args.pid:
@@ -136,14 +405,69 @@ def main():
             start_time = time()
 
             if sz.use_exact or sz.use_fuzzy:
-                for document in art_meta.documents(collection=args.col,
-                                                   from_date=format_date(args.from_date),
-                                                   until_date=format_date(args.until_date)):
-                    logging.info('Normalizing cited references in %s ' % document.publisher_id)
-                    sz.standardize(document)
+                if args.input:
+                    sources = get_file_sources(args.input)
+                else:
+                    sources = get_articlemeta_sources(collection=args.col,
+                                                      from_date=format_date(args.from_date),
+                                                      until_date=format_date(args.until_date),
+                                                      threads=args.fetch_threads,
+                                                      concurrency=args.articlemeta_concurrency if args.async_articlemeta else 0)
+
+                if args.fetch_threads > 0:
+                    prefetcher = DocumentPrefetcher(sources, threads=args.fetch_threads, maxsize=args.fetch_queue_size)
+                    documents = prefetcher
+                else:
+                    documents = (document for source in sources for document in source())
+
+                if args.dump_documents:
+                    documents = dump_documents(documents, args.dump_documents)
+
+                if args.light_citations:
+                    documents = (ArticleRecord(document.data) for document in documents)
+
+                if metrics:
+                    documents = metrics.timed_iter(documents)
+
+                if pool:
+                    standardize_in_workers(sz, documents, pool)
+                else:
+                    sz.standardize_many(documents, max(args.batch_size, 1))
 
             end_time = time()
             logging.info('Duration {0} seconds.'.format(end_time - start_time))
 
+        # Com --workers, os caches são utilizados nos processos de trabalho e os do processo principal ficam vazios
+        if pool:
+            logging.info('Cache statistics are not available with --workers (matching runs in the worker processes)')
+        else:
+            cache_info = sz.fuzzy_match_cache.info()
+            logging.info('Fuzzy match cache: {hits} hits, {misses} misses, {size} of {maxsize} entries'.format(**cache_info))
+
+            cache_info = sz.citation_cache.info()
+            logging.info('Citation cache: {hits} hits, {misses} misses, {size} of {maxsize} entries'.format(**cache_info))
+
+            if sz.persistent_match_cache:
+                logging.info('Persistent match cache: {hits} hits, {misses} misses, {errors} errors'.format(**sz.persistent_match_cache.info()))
+
+        if prefetcher:
+            logging.info('Document prefetcher: {documents} documents, fetch threads waited {producer_wait:.1f}s on a full queue, '
+                         'processing waited {consumer_wait:.1f}s on an empty queue'.format(**prefetcher.info()))
+
     except KeyboardInterrupt:
         print("Interrupt by user")
+
+    finally:
+        if pool:
+            pool.terminate()
+
+        if prefetcher:
+            prefetcher.close()
+
+        try:
+            if sz:
+                sz.close()
+        finally:
+            if metrics:
+                metrics.write()
+                metrics.log_summary()
@@ -22,11 +22,12 @@ setup(
     url="https://github.com/scieloorg/standardized-citations",
     keywords='cited references, normalization, deduplication',
     maintainer_email='rafael.pezzuto@gmail.com',
-    packages=find_packages(),
+    packages=find_packages(exclude=['benchmark', 'benchmark.*', 'tests', 'tests.*']),
     install_requires=install_requires,
     entry_points="""
     [console_scripts]
     normalize=proc.normalize:main
     crossref=proc.crossref:main
+    generate_db=utils.generate_db:cli
     """
 )
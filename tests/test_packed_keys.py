@@ -0,0 +1,133 @@
+import random
+import unittest
+
+from utils.packed_keys import MAX_VOLUME, PackedKeySet, PackedKeyTiers, VALIDATION_TIERS, merge_validation_bases
+from utils.packed_keys import pack_key, pack_str_key, unpack_issn, unpack_key
+
+
+PACKABLE_KEYS = [
+    '00000000-0000-0',
+    '0102030X-2020-1',
+    '1234567X-1999-12',
+    '98765432-2021-%d' % MAX_VOLUME,
+    '99999999-9999-1000',
+]
+
+# Volumes com letras ou zeros à esquerda, volumes acima de MAX_VOLUME, dígito verificador minúsculo, ISSN com hífen e
+# partes ausentes não têm representação textual única e ficam fora da codificação
+NON_PACKABLE_KEYS = [
+    '12345678-2020-12A',
+    '12345678-2020-A',
+    '12345678-2020-012',
+    '12345678-2020-00',
+    '12345678-2020-%d' % (MAX_VOLUME + 1),
+    '1234567x-2020-1',
+    '1234-5678-2020-1',
+    '12345678-20-1',
+    '12345678-2020-',
+    '12345678-2020-1-2',
+]
+
+
+def get_random_keys(rng: random.Random, size: int):
+    keys = set()
+    while len(keys) < size:
+        issn = '%07d%s' % (rng.randrange(10 ** 7), rng.choice('0123456789X'))
+        volume = str(rng.randint(0, 300))
+        if rng.random() < 0.1:
+            volume = rng.choice([volume + 'A', '0' + volume, 'S' + volume])
+        keys.add('%s-%d-%s' % (issn, rng.randint(1900, 2030), volume))
+    return keys
+
+
+class PackKeyTest(unittest.TestCase):
+
+    def test_round_trip(self):
+        for key in PACKABLE_KEYS:
+            packed = pack_str_key(key)
+            self.assertIsNotNone(packed, key)
+            self.assertLess(packed, 1 << 63)
+            self.assertEqual(unpack_key(packed), key)
+            self.assertEqual(unpack_issn(packed), key[:8])
+
+    def test_pack_key_parts(self):
+        for key in PACKABLE_KEYS + NON_PACKABLE_KEYS:
+            issn, year, volume = key[:8], key[9:13], key[14:]
+            if key[8] == '-' and key[13:14] == '-':
+                self.assertEqual(pack_key(issn, year, volume), pack_str_key(key), key)
+
+    def test_non_packable_keys(self):
+        for key in NON_PACKABLE_KEYS:
+            self.assertIsNone(pack_str_key(key), key)
+
+    def test_distinct_keys_are_packed_distinctly(self):
+        keys = [k for k in get_random_keys(random.Random(0), 20000) if pack_str_key(k) is not None]
+        packed = {pack_str_key(k) for k in keys}
+        self.assertEqual(len(packed), len(keys))
+        self.assertEqual({unpack_key(pk) for pk in packed}, set(keys))
+
+
+class PackedKeySetTest(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(1)
+        self.keys = get_random_keys(rng, 5000) | set(PACKABLE_KEYS) | set(NON_PACKABLE_KEYS[:5])
+        self.absent = (get_random_keys(rng, 5000) | set(NON_PACKABLE_KEYS[5:])) - self.keys
+
+        # Chaves próximas das existentes: outro volume, outro dígito verificador ou volume com zero à esquerda
+        for key in list(self.keys)[:500]:
+            issn, year, volume = key[:8], key[9:13], key[14:]
+            self.absent.update({'%s-%s-%s9' % (issn, year, volume),
+                                '%s%s-%s-%s' % (issn[:7], 'X' if issn[7] != 'X' else '0', year, volume),
+                                '%s-%s-0%s' % (issn, year, volume)})
+        self.absent -= self.keys
+
+    def test_membership_parity(self):
+        packed_set = PackedKeySet(self.keys)
+
+        self.assertEqual(len(packed_set), len(self.keys))
+        self.assertEqual(set(packed_set), self.keys)
+
+        for key in self.keys:
+            self.assertIn(key, packed_set)
+            packed = pack_str_key(key)
+            if packed is not None:
+                self.assertIn(packed, packed_set)
+
+        for key in self.absent:
+            self.assertNotIn(key, packed_set)
+
+    def test_residual_keys(self):
+        packed_set = PackedKeySet(self.keys)
+        self.assertEqual(packed_set.residual, {k for k in self.keys if pack_str_key(k) is None})
+        self.assertTrue(packed_set.residual)
+
+    def test_tiers_parity(self):
+        rng = random.Random(2)
+        keys = sorted(self.keys)
+        bases = {name: {k for k in keys if rng.random() < 0.5} for _, name, _ in VALIDATION_TIERS}
+
+        key_to_mask = {}
+        for _, name, bit in VALIDATION_TIERS:
+            for k in bases[name]:
+                key_to_mask[k] = key_to_mask.get(k, 0) | bit
+
+        tiers = merge_validation_bases(bases)
+        self.assertIsInstance(tiers, PackedKeyTiers)
+        self.assertEqual(len(tiers), len(key_to_mask))
+        self.assertEqual(set(tiers), set(key_to_mask))
+
+        for key, mask in key_to_mask.items():
+            self.assertEqual(tiers[key], mask)
+            self.assertEqual(tiers.get(key, 0), mask)
+            packed = pack_str_key(key)
+            if packed is not None:
+                self.assertEqual(tiers[packed], mask)
+
+        for key in self.absent | (self.keys - set(key_to_mask)):
+            self.assertNotIn(key, tiers)
+            self.assertEqual(tiers.get(key, 0), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
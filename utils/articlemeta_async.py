@@ -0,0 +1,226 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+
+from aiohttp import ClientError, ClientSession, ClientTimeout
+from articlemeta.client import dates_pagination, DEFAULT_FROM_DATE
+from datetime import datetime
+from json import JSONDecodeError
+from xylose.scielodocument import Article
+
+
+ARTICLEMETA_URL = os.environ.get('ARTICLEMETA_URL', 'http://articlemeta.scielo.org')
+ARTICLEMETA_CONCURRENCY = int(os.environ.get('ARTICLEMETA_CONCURRENCY', '3'))
+ARTICLEMETA_ATTEMPTS = int(os.environ.get('ARTICLEMETA_ATTEMPTS', '10'))
+ARTICLEMETA_TIMEOUT = int(os.environ.get('ARTICLEMETA_TIMEOUT', '30'))
+
+# Intervalo mínimo, em segundos, entre requisições ao ArticleMeta (que limita as requisições a 3 por segundo por IP)
+ARTICLEMETA_MIN_INTERVAL = float(os.environ.get('ARTICLEMETA_MIN_INTERVAL', '0.4'))
+
+IDENTIFIERS_ENDPOINT = '/api/v1/article/identifiers'
+DOCUMENT_ENDPOINT = '/api/v1/article'
+IDENTIFIERS_PAGE_SIZE = 1000
+
+
+class RequestRateLimiter:
+    """
+    Espaça requisições em pelo menos min_interval segundos. Cada requisição reserva o próximo horário livre, de modo
+    que a mesma instância pode ser compartilhada por várias threads e laços de eventos.
+    """
+
+    def __init__(self, min_interval: float):
+        self.min_interval = min_interval
+        self.next_time = 0.0
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        """
+        Reserva o horário da próxima requisição.
+
+        :return: tempo, em segundos, a aguardar antes de fazer a requisição
+        """
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_time)
+            self.next_time = start + self.min_interval
+            return start - now
+
+
+# Compartilhado por todos os clientes (e threads de obtenção, ver get_articlemeta_sources)
+request_rate_limiter = RequestRateLimiter(ARTICLEMETA_MIN_INTERVAL)
+
+
+class AsyncArticleMetaClient:
+    """
+    Obtém documentos do ArticleMeta com aiohttp: as páginas de identificadores e os documentos de cada página são
+    requisitados de forma concorrente, com no máximo concurrency requisições simultâneas, espaçadas por rate_limiter.
+    Os documentos são disponibilizados como Article por um gerador síncrono, de modo que podem ser consumidos pelo
+    mesmo código que consome RestfulClient.documents.
+    """
+
+    def __init__(self, concurrency=ARTICLEMETA_CONCURRENCY, url=ARTICLEMETA_URL, rate_limiter=request_rate_limiter):
+        self.concurrency = concurrency
+        self.url = url
+        self.rate_limiter = rate_limiter
+        self.semaphore = None
+        self.queue = None
+
+        self.requests = 0
+        self.failed_attempts = 0
+        self.failed_documents = 0
+
+    async def get_json(self, session: ClientSession, endpoint: str, params: dict):
+        """
+        Requisita um endpoint do ArticleMeta, com novas tentativas em caso de falha.
+
+        :param session: sessão aiohttp
+        :param endpoint: caminho do endpoint
+        :param params: parâmetros da requisição
+        :return: resposta em formato de dicionário ou None, caso todas as tentativas falhem
+        """
+        for attempt in range(ARTICLEMETA_ATTEMPTS):
+            try:
+                async with self.semaphore:
+                    delay = self.rate_limiter.reserve()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+
+                    self.requests += 1
+                    async with session.get(self.url + endpoint, params=params) as response:
+                        if response.status == 200:
+                            return await response.json(content_type=None)
+                        logging.warning('ArticleMeta returned %d for %s %s' % (response.status, endpoint, params))
+                        self.failed_attempts += 1
+            except (ClientError, asyncio.TimeoutError, JSONDecodeError) as e:
+                self.failed_attempts += 1
+                logging.warning('Error while requesting %s %s (attempt %d/%d): %s' % (
+                    endpoint, params, attempt + 1, ARTICLEMETA_ATTEMPTS, e))
+
+            await asyncio.sleep(min(2 ** attempt, 60))
+
+        logging.error('Could not retrieve %s %s' % (endpoint, params))
+
+    async def get_identifiers(self, session: ClientSession, params: dict, offset: int):
+        """
+        Obtém uma página de identificadores de documentos.
+
+        :param session: sessão aiohttp
+        :param params: parâmetros da requisição (coleção e intervalo de datas)
+        :param offset: deslocamento da página
+        :return: lista de identificadores (dicionários com code e collection); vazia ao fim do intervalo de datas
+        """
+        page_params = dict(params, limit=IDENTIFIERS_PAGE_SIZE, offset=offset)
+        result = await self.get_json(session, IDENTIFIERS_ENDPOINT, page_params)
+
+        # Uma página que não pôde ser obtida não é confundida com o fim do intervalo, o que o truncaria
+        if result is None:
+            raise ConnectionError('Could not retrieve the identifiers page %s from ArticleMeta' % page_params)
+
+        return result.get('objects', [])
+
+    async def fetch_document(self, session: ClientSession, identifier: dict):
+        """
+        Obtém um documento e o enfileira como Article.
+
+        :param session: sessão aiohttp
+        :param identifier: dicionário com code e collection do documento
+        """
+        result = await self.get_json(session, DOCUMENT_ENDPOINT, {'collection': identifier['collection'],
+                                                                  'code': identifier['code'],
+                                                                  'format': 'xylose',
+                                                                  'body': 'false'})
+        if result is None:
+            self.failed_documents += 1
+        elif result:
+            document = Article(result)
+            if document.data:
+                await self.queue.put(document)
+
+    async def produce(self, collection=None, from_date=None, until_date=None):
+        """
+        Percorre os intervalos de datas paginados pelo ArticleMeta. Em cada intervalo, a próxima página de
+        identificadores é requisitada enquanto os documentos da página atual são obtidos.
+        Ao final, enfileira None.
+
+        :param collection: acrônimo da coleção
+        :param from_date: data inicial (YYYY-MM-DD)
+        :param until_date: data final (YYYY-MM-DD)
+        """
+        try:
+            timeout = ClientTimeout(total=ARTICLEMETA_TIMEOUT)
+            async with ClientSession(timeout=timeout) as session:
+                for window_from, window_until in dates_pagination(from_date or DEFAULT_FROM_DATE,
+                                                                  until_date or datetime.today().isoformat()[:10]):
+                    params = {'from': window_from, 'until': window_until}
+                    if collection:
+                        params['collection'] = collection
+
+                    offset = 0
+                    next_page = asyncio.ensure_future(self.get_identifiers(session, params, offset))
+
+                    while True:
+                        identifiers = await next_page
+                        if not identifiers:
+                            break
+
+                        offset += IDENTIFIERS_PAGE_SIZE
+                        next_page = asyncio.ensure_future(self.get_identifiers(session, params, offset))
+
+                        await asyncio.gather(*[self.fetch_document(session, i) for i in identifiers])
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            await self.queue.put(None)
+            raise
+
+        await self.queue.put(None)
+
+    async def start(self, collection, from_date, until_date):
+        self.semaphore = asyncio.Semaphore(self.concurrency)
+        self.queue = asyncio.Queue(maxsize=2 * self.concurrency)
+        return asyncio.ensure_future(self.produce(collection, from_date, until_date))
+
+    def documents(self, collection=None, from_date=None, until_date=None):
+        """
+        Obtém os documentos publicados em um intervalo de datas. O laço de eventos é executado enquanto o próximo
+        documento é aguardado; o processamento do documento devolvido não é sobreposto às requisições, a menos que o
+        gerador seja consumido em uma thread dedicada (ver DocumentPrefetcher).
+
+        :param collection: acrônimo da coleção
+        :param from_date: data inicial (YYYY-MM-DD)
+        :param until_date: data final (YYYY-MM-DD)
+        :return: gerador de Article
+        """
+        loop = asyncio.new_event_loop()
+        producer = loop.run_until_complete(self.start(collection, from_date, until_date))
+
+        try:
+            while True:
+                document = loop.run_until_complete(self.queue.get())
+                if document is None:
+                    break
+                yield document
+
+            # Propaga exceções ocorridas na obtenção dos documentos
+            loop.run_until_complete(producer)
+        finally:
+            if not producer.done():
+                producer.cancel()
+                loop.run_until_complete(asyncio.gather(producer, return_exceptions=True))
+            loop.close()
+
+            logging.info('ArticleMeta ({from_date} to {until_date}): {requests} requests, {failed_attempts} failed attempts, '
+                         '{failed_documents} documents could not be retrieved'.format(from_date=from_date,
+                                                                                     until_date=until_date,
+                                                                                     **self.info()))
+
+    def info(self):
+        """
+        Obtém as estatísticas das requisições.
+
+        :return: dicionário com requisições feitas, tentativas que falharam e documentos que não puderam ser obtidos
+        """
+        return {'requests': self.requests, 'failed_attempts': self.failed_attempts,
+                'failed_documents': self.failed_documents}
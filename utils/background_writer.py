@@ -0,0 +1,78 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+
+
+PERSIST_QUEUE_SIZE = int(os.environ.get('PERSIST_QUEUE_SIZE', '100'))
+
+
+class BackgroundWriter:
+    """
+    Persiste itens em uma thread dedicada, a partir de uma fila de tamanho limitado.
+    Quando a fila está cheia, put bloqueia até que a thread consuma um item (contrapressão).
+    Se a persistência de um item falha, os itens seguintes são descartados e a exceção é repassada pela próxima
+    chamada de put ou por close. Os itens enfileirados são persistidos ao fim do processo, caso close não tenha sido
+    chamado.
+    """
+
+    def __init__(self, save_function, maxsize=PERSIST_QUEUE_SIZE):
+        self.save_function = save_function
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.closed = False
+        self.error = None
+        self.error_raised = False
+        self.thread = threading.Thread(target=self._run, name='background-writer', daemon=True)
+        self.thread.start()
+
+        atexit.register(self.close)
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            try:
+                if item is None:
+                    return
+                # Após uma falha, a fila continua sendo consumida (sem persistir), para não bloquear put
+                if self.error is None:
+                    self.save_function(item)
+            except Exception as e:
+                logging.error('Error while persisting in background: %s' % e)
+                self.error = e
+            finally:
+                self.queue.task_done()
+
+    def raise_error(self):
+        """
+        Repassa a exceção da persistência em segundo plano, caso tenha ocorrido e ainda não tenha sido repassada.
+        """
+        if self.error is not None and not self.error_raised:
+            self.error_raised = True
+            raise self.error
+
+    def put(self, item):
+        """
+        Enfileira um item a ser persistido. Após close, o item é persistido diretamente.
+
+        :param item: item a ser repassado para save_function
+        """
+        self.raise_error()
+
+        if self.closed:
+            self.save_function(item)
+        else:
+            self.queue.put(item)
+
+    def close(self):
+        """
+        Aguarda a persistência de todos os itens enfileirados, encerra a thread e repassa a exceção da persistência em
+        segundo plano, caso tenha ocorrido.
+        """
+        if not self.closed:
+            self.closed = True
+            self.queue.put(None)
+            self.thread.join()
+            atexit.unregister(self.close)
+
+        self.raise_error()
@@ -0,0 +1,80 @@
+import atexit
+import logging
+import os
+
+from pymongo import errors, UpdateOne
+
+
+MONGO_BULK_WRITE_SIZE = int(os.environ.get('MONGO_BULK_WRITE_SIZE', '1000'))
+
+
+class MongoBulkWriter:
+    """
+    Acumula operações de upsert e as envia ao MongoDB em lotes não ordenados (bulk_write).
+    As operações pendentes são enviadas ao fim do processo, caso close não tenha sido chamado.
+    """
+
+    def __init__(self, collection, batch_size=MONGO_BULK_WRITE_SIZE):
+        self.collection = collection
+        self.batch_size = batch_size
+        self.operations = []
+        self.total_written = 0
+        self.total_matched = 0
+        self.total_failed = 0
+
+        atexit.register(self.flush)
+
+    def upsert(self, _id, fields: dict):
+        """
+        Adiciona ao lote uma operação que atualiza (ou cria) o documento _id com os campos informados.
+
+        :param _id: id do documento
+        :param fields: campos a serem definidos ($set)
+        """
+        self.operations.append(UpdateOne({'_id': _id}, {'$set': fields}, upsert=True))
+
+        if len(self.operations) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Envia as operações pendentes ao MongoDB.
+        """
+        if not self.operations:
+            return
+
+        operations, self.operations = self.operations, []
+
+        try:
+            result = self.collection.bulk_write(operations, ordered=False)
+            self.total_written += result.upserted_count + result.modified_count
+            self.total_matched += result.matched_count
+        except errors.BulkWriteError as e:
+            # Em lotes não ordenados, as demais operações do lote são executadas
+            write_errors = e.details.get('writeErrors', [])
+            self.total_written += e.details.get('nUpserted', 0) + e.details.get('nModified', 0)
+            self.total_matched += e.details.get('nMatched', 0)
+            self.total_failed += len(write_errors)
+            logging.error('BulkWriteError: {0} of {1} operations failed'.format(len(write_errors), len(operations)))
+            logging.error(write_errors[:10])
+        except errors.PyMongoError:
+            # Falhas de conexão (ServerSelectionTimeoutError, AutoReconnect, NetworkTimeout) perdem o lote inteiro
+            self.total_failed += len(operations)
+            logging.error('{0} operations could not be sent to MongoDB'.format(len(operations)))
+            raise
+
+    def close(self):
+        """
+        Envia as operações pendentes, registra no log a quantidade de documentos criados ou alterados, de documentos
+        encontrados (inclusive os que já tinham os mesmos valores) e de operações que falharam e desfaz o registro de
+        envio ao fim do processo.
+        """
+        try:
+            self.flush()
+        finally:
+            atexit.unregister(self.flush)
+
+            logging.info('Mongo bulk writer: {0} documents upserted or modified, {1} matched, {2} operations failed'.format(
+                self.total_written, self.total_matched, self.total_failed))
+            if self.total_failed:
+                logging.error('{0} operations could not be written to MongoDB'.format(self.total_failed))
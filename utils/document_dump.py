@@ -0,0 +1,86 @@
+import gzip
+import json
+
+from utils.jsonl_writer import COMPRESSION_EXTENSIONS, JSONLWriter
+from xylose.scielodocument import Article
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def split_compression(path: str):
+    """
+    Identifica a compressão de um arquivo JSONL pela extensão.
+
+    :param path: caminho do arquivo (por exemplo, docs.jsonl, docs.jsonl.gz ou docs.jsonl.zst)
+    :return: tupla (caminho sem a extensão de compressão, compressão ou None)
+    """
+    for compression, ext in COMPRESSION_EXTENSIONS.items():
+        if path.endswith(ext):
+            return path[:-len(ext)], compression
+    return path, None
+
+
+def read_documents(path: str):
+    """
+    Lê documentos do ArticleMeta (JSON bruto, um por linha) de um arquivo, possivelmente comprimido com gzip ou zstd.
+
+    :param path: caminho do arquivo
+    :return: gerador de Article
+    """
+    _, compression = split_compression(path)
+
+    if compression == 'gzip':
+        f = gzip.open(path, 'rb')
+    elif compression == 'zstd':
+        if not zstandard:
+            raise ValueError('Compression zstd requires the zstandard package')
+        f = zstandard.open(path, 'rb')
+    else:
+        f = open(path, 'rb')
+
+    loads = orjson.loads if orjson else json.loads
+
+    with f:
+        for line in f:
+            if line.strip():
+                yield Article(loads(line))
+
+
+def get_file_sources(paths: list):
+    """
+    Obtém fontes de documentos (ver DocumentPrefetcher) a partir de arquivos JSONL, uma por arquivo.
+
+    :param paths: caminhos dos arquivos
+    :return: lista de funções que devolvem iteráveis de documentos (Article)
+    """
+    return [lambda path=path: read_documents(path) for path in paths]
+
+
+def dump_documents(documents, path: str):
+    """
+    Repassa documentos, gravando o JSON bruto de cada um, uma linha por documento, em path. A compressão é definida
+    pela extensão de path (.gz ou .zst). O arquivo gerado pode ser lido com read_documents.
+
+    :param documents: iterável de documentos (Article)
+    :param path: caminho do arquivo
+    :return: gerador dos mesmos documentos
+    """
+    path, compression = split_compression(path)
+
+    # O arquivo não é dividido em partes (independentemente de JSON_MAX_BYTES), pois read_documents lê um único arquivo
+    writer = JSONLWriter(path, compression, max_bytes=0)
+
+    try:
+        for document in documents:
+            writer.write(document.data)
+            yield document
+    finally:
+        writer.close()
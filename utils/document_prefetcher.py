@@ -0,0 +1,146 @@
+import logging
+import os
+import queue
+import threading
+import time
+
+from articlemeta.client import dates_pagination, DEFAULT_FROM_DATE, RestfulClient
+from datetime import datetime
+from utils.articlemeta_async import AsyncArticleMetaClient
+
+
+# Obtenção antecipada desativada por padrão (0): os documentos são obtidos sequencialmente, no laço de processamento
+FETCH_THREADS = int(os.environ.get('FETCH_THREADS', '0'))
+FETCH_QUEUE_SIZE = int(os.environ.get('FETCH_QUEUE_SIZE', '100'))
+
+# Intervalo (em segundos) em que uma thread bloqueada na fila verifica se a leitura foi encerrada
+FETCH_POLL_INTERVAL = 1
+
+
+class DocumentPrefetcher:
+    """
+    Obtém documentos em threads dedicadas e os disponibiliza, por iteração, a partir de uma fila de tamanho limitado.
+    Cada thread consome fontes (funções que devolvem iteráveis de documentos) de uma lista compartilhada, de modo que a
+    obtenção dos documentos (E/S de rede) ocorre em paralelo ao seu processamento.
+    Registra o tempo em que as threads aguardaram espaço na fila (processamento mais lento que a obtenção) e o tempo
+    em que o consumidor aguardou documentos (obtenção mais lenta que o processamento).
+    As threads são iniciadas apenas no início da iteração (por exemplo, após a criação de processos com fork).
+    """
+
+    def __init__(self, sources: list, threads=FETCH_THREADS, maxsize=FETCH_QUEUE_SIZE):
+        self.sources = queue.Queue()
+        for source in sources:
+            self.sources.put(source)
+
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.stop = threading.Event()
+        self.lock = threading.Lock()
+
+        self.total_documents = 0
+        self.producer_wait = 0.0
+        self.consumer_wait = 0.0
+
+        self.threads = [threading.Thread(target=self._run, name='document-prefetcher-%d' % i, daemon=True)
+                        for i in range(min(threads, len(sources)) or 1)]
+
+    def _put(self, item):
+        """
+        Enfileira um item, aguardando espaço na fila enquanto a leitura não é encerrada.
+
+        :param item: item a ser enfileirado
+        :return: True se o item foi enfileirado, False se a leitura foi encerrada
+        """
+        start = time.time()
+        while not self.stop.is_set():
+            try:
+                self.queue.put(item, timeout=FETCH_POLL_INTERVAL)
+                with self.lock:
+                    self.producer_wait += time.time() - start
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _run(self):
+        try:
+            while not self.stop.is_set():
+                try:
+                    source = self.sources.get_nowait()
+                except queue.Empty:
+                    break
+
+                for document in source():
+                    if not self._put(document):
+                        return
+        except Exception as e:
+            logging.error('Error while fetching documents: %s' % e)
+            self._put(e)
+        finally:
+            self._put(None)
+
+    def __iter__(self):
+        for t in self.threads:
+            t.start()
+
+        running = len(self.threads)
+
+        while running:
+            start = time.time()
+            item = self.queue.get()
+            self.consumer_wait += time.time() - start
+
+            if item is None:
+                running -= 1
+            elif isinstance(item, Exception):
+                self.close()
+                raise item
+            else:
+                self.total_documents += 1
+                yield item
+
+    def close(self):
+        """
+        Encerra a leitura de documentos.
+        """
+        self.stop.set()
+
+    def info(self):
+        """
+        Obtém estatísticas de uso da fila.
+
+        :return: dicionário com a quantidade de documentos obtidos e os tempos de espera, em segundos, das threads de
+        obtenção (fila cheia) e do consumidor (fila vazia)
+        """
+        return {'documents': self.total_documents,
+                'producer_wait': self.producer_wait,
+                'consumer_wait': self.consumer_wait}
+
+
+def get_articlemeta_sources(collection=None, from_date=None, until_date=None, threads=FETCH_THREADS, concurrency=0):
+    """
+    Divide a coleta de documentos do ArticleMeta em fontes a serem consumidas por DocumentPrefetcher.
+    Com mais de uma thread, cada intervalo de datas paginado pelo ArticleMeta é uma fonte; com uma thread, há uma única
+    fonte, que percorre os documentos na mesma ordem que RestfulClient.documents.
+
+    :param collection: acrônimo da coleção
+    :param from_date: data inicial (YYYY-MM-DD)
+    :param until_date: data final (YYYY-MM-DD)
+    :param threads: quantidade de threads de obtenção
+    :param concurrency: quantidade de requisições simultâneas por fonte, com AsyncArticleMetaClient; com 0, as fontes
+    usam RestfulClient, uma requisição por vez
+    :return: lista de funções que devolvem iteráveis de documentos (Article)
+    """
+    def get_source(window_from, window_until):
+        if concurrency:
+            return lambda: AsyncArticleMetaClient(concurrency).documents(collection=collection,
+                                                                         from_date=window_from,
+                                                                         until_date=window_until)
+        return lambda: RestfulClient().documents(collection=collection, from_date=window_from, until_date=window_until)
+
+    if threads <= 1:
+        return [get_source(from_date, until_date)]
+
+    from_date = from_date or DEFAULT_FROM_DATE
+    until_date = until_date or datetime.today().isoformat()[:10]
+
+    return [get_source(f, u) for f, u in dates_pagination(from_date, until_date)]
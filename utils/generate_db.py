@@ -1,10 +1,17 @@
 import argparse
 import csv
 import logging
+import os
 import pickle
 import textwrap
 
 from datetime import datetime
+from model.journal import compact_journal_data, get_deep_size
+from utils import mmap_db
+from utils.packed_keys import merge_validation_bases
+
+
+DB_FORMAT_EXTENSIONS = {'pickle': '.bin', 'mmap': '.mmdb', 'sections': '.sdb'}
 
 
 def clean_issn(issn: str):
@@ -160,10 +167,26 @@ def save(db_data, path_db):
         pickle.dump(db_data, f)
 
 
-def main(path_db_title, path_db_year_volume, path_db_year_volume_lr, path_equations, version):
+def main(path_db_title, path_db_year_volume, path_db_year_volume_lr, path_equations, version, db_format='pickle',
+         dir_output='.', legacy_validation_sets=False):
+    """
+    Gera a base de correção.
+    As bases de validação ISSN-ANO-VOLUME são unidas em issn-year-volume-tiers. Com legacy_validation_sets, também são
+    gravadas separadamente (issn-year-volume, issn-year-volume-lr e issn-year-volume-lr-ml1), como sets de strings, para
+    leitores da base que ainda consultam essas chaves.
+
+    :return: caminho da base de correção gerada
+    """
     logging.info('Loading title data')
     issnl_to_data, title_to_issnl, issn_to_issnl = get_db_issnl_and_db_title(path_db_title)
 
+    logging.info('Compacting title data')
+    size_before = get_deep_size(issnl_to_data, title_to_issnl, issn_to_issnl)
+    issnl_to_data, title_to_issnl, issn_to_issnl = compact_journal_data(issnl_to_data, title_to_issnl, issn_to_issnl)
+    size_after = get_deep_size(issnl_to_data, title_to_issnl, issn_to_issnl)
+    logging.info('Title data compacted from %.1f MB to %.1f MB (%.1f MB saved)' % (
+        size_before / 1024 ** 2, size_after / 1024 ** 2, (size_before - size_after) / 1024 ** 2))
+
     logging.info('Loading year-volume data')
     issn_year_volume, title_year_volume = get_db_year_volume(path_db_year_volume)
 
@@ -173,24 +196,38 @@ def main(path_db_title, path_db_year_volume, path_db_year_volume_lr, path_equati
     logging.info('Loading issnl linear regressions')
     issn_to_equation = get_equations(path_equations)
 
+    logging.info('Packing year-volume data')
     dbs = {
         'issnl-to-data': issnl_to_data,
         'issn-to-issnl': issn_to_issnl,
         'title-to-issnl': title_to_issnl,
-        'issn-year-volume': issn_year_volume,
         'title-year-volume': title_year_volume,
-        'issn-year-volume-lr': issn_year_volume_lr,
-        'issn-year-volume-lr-ml1': issn_year_volume_lr_ml1,
+        'issn-year-volume-tiers': merge_validation_bases({'issn-year-volume': issn_year_volume,
+                                                          'issn-year-volume-lr': issn_year_volume_lr,
+                                                          'issn-year-volume-lr-ml1': issn_year_volume_lr_ml1}),
         'issn-to-equation': issn_to_equation,
         'version': version,
         'creation-date': datetime.now().strftime('%Y-%m-%d')
     }
 
-    save(dbs, 'bc-' + version + '.bin')
+    if legacy_validation_sets:
+        dbs.update({'issn-year-volume': issn_year_volume,
+                    'issn-year-volume-lr': issn_year_volume_lr,
+                    'issn-year-volume-lr-ml1': issn_year_volume_lr_ml1})
 
+    path_db = os.path.join(dir_output, 'bc-' + version + DB_FORMAT_EXTENSIONS[db_format])
+
+    if db_format == 'mmap':
+        mmap_db.save(dbs, path_db)
+    elif db_format == 'sections':
+        mmap_db.save(dbs, path_db, use_pickle=True)
+    else:
+        save(dbs, path_db)
+
+    return path_db
 
-if __name__ == '__main__':
 
+def cli():
     usage = "generate a binary file representing a journal title correction database"
 
     parser = argparse.ArgumentParser(textwrap.dedent(usage))
@@ -230,6 +267,31 @@ if __name__ == '__main__':
         help='version of the binary file generated'
     )
 
+    parser.add_argument(
+        '-f', '--format',
+        default='pickle',
+        dest='db_format',
+        choices=sorted(DB_FORMAT_EXTENSIONS),
+        help='format of the generated database: a pickled binary file, a directory of memory-mappable tables or a '
+             'directory of pickled sections loaded on first access'
+    )
+
+    parser.add_argument(
+        '-o', '--dir_output',
+        default='.',
+        dest='dir_output',
+        help='directory where the binary file is generated'
+    )
+
+    parser.add_argument(
+        '--legacy_validation_sets',
+        default=False,
+        action='store_true',
+        dest='legacy_validation_sets',
+        help='also write the issn-year-volume, issn-year-volume-lr and issn-year-volume-lr-ml1 sets, read by '
+             'consumers that do not support issn-year-volume-tiers'
+    )
+
     args = parser.parse_args()
 
     path_db_issnl_to_data = args.il2data
@@ -239,4 +301,9 @@ if __name__ == '__main__':
 
     version = args.version
 
-    main(path_db_issnl_to_data, path_db_year_volume, path_db_year_volume_lr, path_issnl_to_equation, version)
+    main(path_db_issnl_to_data, path_db_year_volume, path_db_year_volume_lr, path_issnl_to_equation, version, args.db_format,
+         args.dir_output, args.legacy_validation_sets)
+
+
+if __name__ == '__main__':
+    cli()
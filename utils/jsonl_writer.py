@@ -0,0 +1,112 @@
+import atexit
+import gzip
+import io
+import json
+import os
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+JSON_COMPRESSION = os.environ.get('JSON_COMPRESSION', '')
+JSON_MAX_BYTES = int(os.environ.get('JSON_MAX_BYTES', '0'))
+JSON_BUFFER_SIZE = 1024 * 1024
+
+COMPRESSION_EXTENSIONS = {'gzip': '.gz', 'zstd': '.zst'}
+
+
+def dumps(record):
+    """
+    Converte record para uma linha JSON codificada em UTF-8.
+    Usa orjson, se estiver instalado.
+
+    :param record: dicionário a ser convertido
+    :return: bytes da linha JSON, com quebra de linha
+    """
+    if orjson:
+        return orjson.dumps(record) + b'\n'
+    return json.dumps(record).encode('utf-8') + b'\n'
+
+
+class JSONLWriter:
+    """
+    Escreve registros JSON, um por linha, em um arquivo mantido aberto e com buffer.
+    Opcionalmente, comprime o arquivo (gzip ou zstd) e o divide em partes numeradas quando max_bytes (não
+    comprimidos) é atingido.
+    """
+
+    def __init__(self, path: str, compression=JSON_COMPRESSION, max_bytes=JSON_MAX_BYTES):
+        if compression and compression not in COMPRESSION_EXTENSIONS:
+            raise ValueError('Compression {0} is not supported'.format(compression))
+
+        if compression == 'zstd' and not zstandard:
+            raise ValueError('Compression zstd requires the zstandard package')
+
+        self.path = path
+        self.compression = compression
+        self.max_bytes = max_bytes
+        self.shard = 0
+        self.shard_bytes = 0
+        self.file = None
+
+        atexit.register(self.close)
+
+    def get_shard_path(self):
+        """
+        Obtém o caminho do arquivo em escrita. Com divisão em partes, o número da parte é inserido antes da extensão.
+
+        :return: caminho do arquivo
+        """
+        path = self.path
+        if self.max_bytes:
+            root, ext = os.path.splitext(path)
+            path = '{0}-{1:04d}{2}'.format(root, self.shard, ext)
+        return path + COMPRESSION_EXTENSIONS.get(self.compression, '')
+
+    def open(self):
+        """
+        Abre o arquivo da parte atual, em modo de adição.
+        """
+        path = self.get_shard_path()
+
+        if self.compression == 'gzip':
+            self.file = io.BufferedWriter(gzip.open(path, 'ab'), JSON_BUFFER_SIZE)
+        elif self.compression == 'zstd':
+            self.file = zstandard.open(path, 'ab')
+        else:
+            self.file = open(path, 'ab', buffering=JSON_BUFFER_SIZE)
+
+    def write(self, record):
+        """
+        Escreve um registro em uma linha.
+
+        :param record: dicionário a ser escrito
+        """
+        line = dumps(record)
+
+        if self.file and self.max_bytes and self.shard_bytes + len(line) > self.max_bytes:
+            self.file.close()
+            self.file = None
+            self.shard += 1
+            self.shard_bytes = 0
+
+        if not self.file:
+            self.open()
+
+        self.file.write(line)
+        self.shard_bytes += len(line)
+
+    def close(self):
+        """
+        Persiste o buffer e fecha o arquivo em escrita.
+        """
+        if self.file:
+            self.file.close()
+            self.file = None
@@ -0,0 +1,303 @@
+import json
+import logging
+import mmap
+import os
+import pickle
+import struct
+import time
+import zlib
+
+from array import array
+from collections.abc import Mapping, Set
+from utils.packed_keys import PackedKeySet, PackedKeyTiers
+
+
+MMAP_DB_META = 'meta.json'
+MMAP_TABLE_MAGIC = b'SCMT0001'
+MMAP_TABLE_HEADER = struct.Struct('<8sQQQ')
+
+SECTION_TYPE_MAP = 'map'
+SECTION_TYPE_SET = 'set'
+SECTION_TYPE_PACKED = 'packed'
+SECTION_TYPE_PACKED_TIERS = 'packed-tiers'
+SECTION_TYPE_PICKLE = 'pickle'
+
+SECTION_FILE_EXTENSIONS = ['.tbl', '.u64', '.u8', '.pkl']
+
+
+def write_table(path_table: str, data):
+    """
+    Persiste um dicionário (ou set) em uma tabela de chaves ordenadas que pode ser lida com mmap.
+
+    Formato: cabeçalho (magic, quantidade de chaves, indicador de valores, quantidade de posições da tabela hash),
+    deslocamentos das chaves, deslocamentos dos valores (apenas para dicionários), tabela hash (crc32, sondagem linear)
+    com as posições das chaves, chaves em UTF-8 ordenadas e valores serializados com pickle.
+
+    :param path_table: caminho do arquivo da tabela
+    :param data: dicionário ou set a ser persistido
+    """
+    has_values = isinstance(data, dict)
+
+    items = sorted((k.encode('utf-8'), k) for k in data)
+
+    key_offsets = array('Q', [0])
+    value_offsets = array('Q', [0])
+    keys = []
+    values = []
+
+    for encoded_key, key in items:
+        keys.append(encoded_key)
+        key_offsets.append(key_offsets[-1] + len(encoded_key))
+
+        if has_values:
+            value = pickle.dumps(data[key], protocol=pickle.HIGHEST_PROTOCOL)
+            values.append(value)
+            value_offsets.append(value_offsets[-1] + len(value))
+
+    # Tabela hash com ao menos o dobro de posições que chaves; cada posição guarda a posição da chave mais um
+    n_slots = 2
+    while n_slots < 2 * len(items):
+        n_slots *= 2
+
+    slots = array('I', bytes(4 * n_slots))
+    for i, k in enumerate(keys):
+        h = zlib.crc32(k) & (n_slots - 1)
+        while slots[h]:
+            h = (h + 1) & (n_slots - 1)
+        slots[h] = i + 1
+
+    with open(path_table, 'wb') as f:
+        f.write(MMAP_TABLE_HEADER.pack(MMAP_TABLE_MAGIC, len(items), int(has_values), n_slots))
+        key_offsets.tofile(f)
+        if has_values:
+            value_offsets.tofile(f)
+        slots.tofile(f)
+        for k in keys:
+            f.write(k)
+        for v in values:
+            f.write(v)
+
+
+def save(db_data: dict, path_db: str, use_pickle=False):
+    """
+    Persiste a base de correção em um diretório, com uma tabela mapeável em memória por seção.
+    Entradas que não são dicionários nem sets (por exemplo, version e creation-date) são gravadas em meta.json.
+
+    :param db_data: dados a serem persistidos
+    :param path_db: diretório a ser criado
+    :param use_pickle: grava cada seção em um arquivo pickle próprio, carregado integralmente no primeiro acesso,
+    em vez de uma tabela mapeável em memória
+    """
+    os.makedirs(path_db, exist_ok=True)
+
+    meta = {'sections': {}}
+
+    for name, data in db_data.items():
+        if use_pickle and isinstance(data, (dict, set, frozenset, PackedKeySet, PackedKeyTiers)):
+            meta['sections'][name] = SECTION_TYPE_PICKLE
+            with open(os.path.join(path_db, name + '.pkl'), 'wb') as f:
+                pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+            continue
+        elif isinstance(data, PackedKeySet):
+            meta['sections'][name] = SECTION_TYPE_PACKED
+            with open(os.path.join(path_db, name + '.u64'), 'wb') as f:
+                f.write(memoryview(data.packed).cast('B'))
+            write_table(os.path.join(path_db, name + '.tbl'), data.residual)
+            continue
+        elif isinstance(data, PackedKeyTiers):
+            meta['sections'][name] = SECTION_TYPE_PACKED_TIERS
+            with open(os.path.join(path_db, name + '.u64'), 'wb') as f:
+                f.write(memoryview(data.packed).cast('B'))
+            with open(os.path.join(path_db, name + '.u8'), 'wb') as f:
+                f.write(data.masks)
+            write_table(os.path.join(path_db, name + '.tbl'), dict(data.residual))
+            continue
+        elif isinstance(data, dict):
+            meta['sections'][name] = SECTION_TYPE_MAP
+        elif isinstance(data, (set, frozenset)):
+            meta['sections'][name] = SECTION_TYPE_SET
+        else:
+            meta[name] = data
+            continue
+
+        write_table(os.path.join(path_db, name + '.tbl'), data)
+
+    with open(os.path.join(path_db, MMAP_DB_META), 'w') as f:
+        json.dump(meta, f)
+
+
+def map_packed_keys(path_packed: str, typecode='Q'):
+    """
+    Mapeia em memória um array ordenado de chaves codificadas (inteiros de 64 bits) ou outro array de tipo typecode.
+
+    :param path_packed: caminho do arquivo do array
+    :param typecode: tipo dos elementos do array
+    :return: memoryview dos elementos
+    """
+    if not os.path.getsize(path_packed):
+        return array(typecode)
+
+    with open(path_packed, 'rb') as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return memoryview(mm).cast(typecode)
+
+
+class MmapSortedKeys:
+    """
+    Tabela de chaves ordenadas, lida sob demanda a partir de um arquivo mapeado em memória.
+    As páginas do arquivo são compartilhadas entre processos pelo cache de páginas do sistema operacional.
+    """
+
+    def __init__(self, path_table: str):
+        with open(path_table, 'rb') as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self.count, has_values, self.n_slots = MMAP_TABLE_HEADER.unpack_from(self.mm, 0)
+        if magic != MMAP_TABLE_MAGIC:
+            raise ValueError('File {0} is not a table'.format(path_table))
+
+        slots_start = MMAP_TABLE_HEADER.size + 8 * (self.count + 1) * (2 if has_values else 1)
+        self.keys_start = slots_start + 4 * self.n_slots
+
+        offsets = memoryview(self.mm)[MMAP_TABLE_HEADER.size:slots_start].cast('Q')
+        self.key_offsets = offsets[:self.count + 1]
+        self.value_offsets = offsets[self.count + 1:] if has_values else None
+        self.slots = memoryview(self.mm)[slots_start:self.keys_start].cast('I')
+
+        self.values_start = self.keys_start + self.key_offsets[self.count]
+
+    def get_key(self, i: int):
+        """
+        Obtém a i-ésima chave da tabela, em bytes.
+
+        :param i: posição da chave
+        :return: chave codificada em UTF-8
+        """
+        return self.mm[self.keys_start + self.key_offsets[i]:self.keys_start + self.key_offsets[i + 1]]
+
+    def find(self, key):
+        """
+        Procura key na tabela hash.
+
+        :param key: chave procurada
+        :return: posição da chave na tabela ou -1, caso não exista
+        """
+        if not isinstance(key, str):
+            return -1
+
+        encoded_key = key.encode('utf-8')
+        mask = self.n_slots - 1
+        h = zlib.crc32(encoded_key) & mask
+        while self.slots[h]:
+            i = self.slots[h] - 1
+            if self.get_key(i) == encoded_key:
+                return i
+            h = (h + 1) & mask
+        return -1
+
+    def __contains__(self, key):
+        return self.find(key) != -1
+
+    def __iter__(self):
+        for i in range(self.count):
+            yield self.get_key(i).decode('utf-8')
+
+    def __len__(self):
+        return self.count
+
+
+class MmapKeySet(MmapSortedKeys, Set):
+    """
+    Set somente leitura mapeado em memória.
+    """
+
+
+class MmapTable(MmapSortedKeys, Mapping):
+    """
+    Dicionário somente leitura cujos valores são desserializados apenas quando consultados.
+    """
+
+    def __getitem__(self, key):
+        i = self.find(key)
+        if i == -1:
+            raise KeyError(key)
+
+        start = self.values_start + self.value_offsets[i]
+        end = self.values_start + self.value_offsets[i + 1]
+        return pickle.loads(self.mm[start:end])
+
+
+class MmapDatabase(Mapping):
+    """
+    Base de correção persistida por save. Cada seção é aberta (mapeada em memória ou carregada do seu arquivo pickle)
+    no primeiro acesso, de modo que seções não utilizadas não são lidas.
+    """
+
+    def __init__(self, path_db: str):
+        self.path_db = path_db
+
+        with open(os.path.join(path_db, MMAP_DB_META)) as f:
+            self.meta = json.load(f)
+
+        self.sections = {}
+
+    def open_section(self, name: str):
+        """
+        Abre uma seção e registra em log o tempo de abertura e o tamanho dos seus arquivos.
+
+        :param name: nome da seção
+        :return: seção aberta
+        """
+        start = time.time()
+
+        path_section = os.path.join(self.path_db, name)
+        section_type = self.meta['sections'][name]
+
+        if section_type == SECTION_TYPE_PICKLE:
+            with open(path_section + '.pkl', 'rb') as f:
+                section = pickle.load(f)
+        elif section_type == SECTION_TYPE_MAP:
+            section = MmapTable(path_section + '.tbl')
+        elif section_type == SECTION_TYPE_PACKED:
+            section = PackedKeySet(packed=map_packed_keys(path_section + '.u64'),
+                                   residual=MmapKeySet(path_section + '.tbl'))
+        elif section_type == SECTION_TYPE_PACKED_TIERS:
+            section = PackedKeyTiers(packed=map_packed_keys(path_section + '.u64'),
+                                     masks=map_packed_keys(path_section + '.u8', 'B'),
+                                     residual=MmapTable(path_section + '.tbl'))
+        else:
+            section = MmapKeySet(path_section + '.tbl')
+
+        size = sum(os.path.getsize(path_section + ext) for ext in SECTION_FILE_EXTENSIONS
+                   if os.path.exists(path_section + ext))
+        logging.info('Section %s (%s, %.1f MB) loaded in %.2fs' % (name, section_type, size / 1024 ** 2,
+                                                                   time.time() - start))
+        return section
+
+    def load(self, names):
+        """
+        Abre antecipadamente as seções informadas, caso existam.
+
+        :param names: nomes das seções
+        """
+        for name in names:
+            if name in self.meta['sections']:
+                self[name]
+
+    def __getitem__(self, name):
+        if name in self.meta['sections']:
+            if name not in self.sections:
+                self.sections[name] = self.open_section(name)
+            return self.sections[name]
+
+        if name != 'sections' and name in self.meta:
+            return self.meta[name]
+
+        raise KeyError(name)
+
+    def __iter__(self):
+        yield from self.meta['sections']
+        yield from (k for k in self.meta if k != 'sections')
+
+    def __len__(self):
+        return len(self.meta) - 1 + len(self.meta['sections'])
@@ -0,0 +1,179 @@
+import re
+
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping, Set
+
+
+# ISSN (7 dígitos e dígito verificador), ano com 4 dígitos e volume sem zeros à esquerda
+packable_key_pattern = re.compile(r'(\d{7})([\dX])-(\d{4})-(0|[1-9]\d{0,6})')
+
+YEAR_BITS = 14
+VOLUME_BITS = 22
+MAX_VOLUME = (1 << VOLUME_BITS) - 1
+
+# Bases de validação ISSN-ANO-VOLUME, na ordem em que são consultadas: (base utilizada, nome da base, bit na máscara)
+VALIDATION_TIERS = [
+    ('default', 'issn-year-volume', 1),
+    ('lr', 'issn-year-volume-lr', 2),
+    ('lr-ml1', 'issn-year-volume-lr-ml1', 4),
+]
+VALIDATION_TIERS_BASE = 'issn-year-volume-tiers'
+
+
+def pack_key(issn: str, year: str, volume: str):
+    """
+    Codifica uma chave ISSN-ANO-VOLUME em um inteiro de 63 bits: ISSN (27 bits), ano (14 bits) e volume (22 bits).
+    Apenas chaves cuja representação textual pode ser reconstruída de modo único são codificadas.
+
+    :param issn: ISSN sem hífen
+    :param year: ano com 4 dígitos
+    :param volume: volume
+    :return: inteiro que representa a chave ou None, caso a chave não possa ser codificada
+    """
+    return pack_str_key('-'.join([issn, year, volume]))
+
+
+def pack_str_key(key: str):
+    """
+    Codifica uma chave no formato ISSN-ANO-VOLUME em um inteiro.
+
+    :param key: chave no formato ISSN-ANO-VOLUME
+    :return: inteiro que representa a chave ou None, caso a chave não possa ser codificada
+    """
+    match = packable_key_pattern.fullmatch(key)
+    if not match:
+        return
+
+    issn_digits, check_digit, year, volume = match.groups()
+
+    volume = int(volume)
+    if volume > MAX_VOLUME:
+        return
+
+    issn_code = int(issn_digits) * 11 + (10 if check_digit == 'X' else int(check_digit))
+    return (issn_code << (YEAR_BITS + VOLUME_BITS)) | (int(year) << VOLUME_BITS) | volume
+
+
+def unpack_issn(packed_key: int):
+    """
+    Obtém o ISSN (sem hífen) de uma chave codificada.
+
+    :param packed_key: chave codificada por pack_key
+    :return: ISSN
+    """
+    issn_digits, check_digit = divmod(packed_key >> (YEAR_BITS + VOLUME_BITS), 11)
+    return '%07d%s' % (issn_digits, 'X' if check_digit == 10 else check_digit)
+
+
+def unpack_key(packed_key: int):
+    """
+    Obtém a chave ISSN-ANO-VOLUME de uma chave codificada.
+
+    :param packed_key: chave codificada por pack_key
+    :return: chave no formato ISSN-ANO-VOLUME
+    """
+    year = (packed_key >> VOLUME_BITS) & ((1 << YEAR_BITS) - 1)
+    volume = packed_key & MAX_VOLUME
+    return '%s-%04d-%d' % (unpack_issn(packed_key), year, volume)
+
+
+class PackedKeySet(Set):
+    """
+    Set de chaves ISSN-ANO-VOLUME armazenadas como inteiros de 64 bits em um array ordenado.
+    Chaves que não podem ser codificadas são mantidas em um set de strings à parte.
+    Aceita consultas por chaves codificadas (int) ou textuais (str).
+    """
+
+    def __init__(self, keys=(), packed=None, residual=None):
+        if packed is None:
+            packed_keys = set()
+            residual = set()
+            for k in keys:
+                pk = pack_str_key(k)
+                if pk is None:
+                    residual.add(k)
+                else:
+                    packed_keys.add(pk)
+            packed = array('Q', sorted(packed_keys))
+
+        self.packed = packed
+        self.residual = residual if residual is not None else set()
+
+    def __contains__(self, key):
+        if isinstance(key, str):
+            pk = pack_str_key(key)
+            if pk is None:
+                return key in self.residual
+            key = pk
+
+        i = bisect_left(self.packed, key)
+        return i < len(self.packed) and self.packed[i] == key
+
+    def __iter__(self):
+        for pk in self.packed:
+            yield unpack_key(pk)
+        yield from self.residual
+
+    def __len__(self):
+        return len(self.packed) + len(self.residual)
+
+
+class PackedKeyTiers(Mapping):
+    """
+    Dicionário somente leitura de chave ISSN-ANO-VOLUME para máscara de bits das bases de validação em que a chave
+    ocorre. As chaves codificáveis ficam em um array ordenado de inteiros de 64 bits, com as máscaras em um array
+    paralelo de bytes; as demais ficam em um dicionário de strings à parte.
+    """
+
+    def __init__(self, key_to_mask=None, packed=None, masks=None, residual=None):
+        if packed is None:
+            packed_to_mask = {}
+            residual = {}
+            for k, mask in (key_to_mask or {}).items():
+                pk = pack_str_key(k)
+                if pk is None:
+                    residual[k] = mask
+                else:
+                    packed_to_mask[pk] = mask
+            packed = array('Q', sorted(packed_to_mask))
+            masks = array('B', [packed_to_mask[pk] for pk in packed])
+
+        self.packed = packed
+        self.masks = masks
+        self.residual = residual if residual is not None else {}
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            pk = pack_str_key(key)
+            if pk is None:
+                return self.residual[key]
+            key = pk
+
+        i = bisect_left(self.packed, key)
+        if i < len(self.packed) and self.packed[i] == key:
+            return self.masks[i]
+        raise KeyError(key)
+
+    def __iter__(self):
+        for pk in self.packed:
+            yield unpack_key(pk)
+        yield from self.residual
+
+    def __len__(self):
+        return len(self.packed) + len(self.residual)
+
+
+def merge_validation_bases(bases: dict):
+    """
+    Une as bases de validação ISSN-ANO-VOLUME em um único PackedKeyTiers, em que cada chave é associada à máscara de
+    bits (VALIDATION_TIERS) das bases em que ocorre.
+
+    :param bases: dicionário de nome da base de validação para a base (set de chaves)
+    :return: PackedKeyTiers com a máscara de bits de cada chave
+    """
+    key_to_mask = {}
+    for _, name, bit in VALIDATION_TIERS:
+        for k in bases[name]:
+            key_to_mask[k] = key_to_mask.get(k, 0) | bit
+    return PackedKeyTiers(key_to_mask)
@@ -0,0 +1,307 @@
+import json
+import logging
+import os
+import threading
+import time
+
+from bisect import bisect_left
+from datetime import datetime
+
+
+METRICS_INTERVAL = int(os.environ.get('METRICS_INTERVAL', '60'))
+METRICS_FORMATS = ['json', 'prometheus']
+METRICS_PREFIX = 'standardized_citations'
+
+# Limites superiores (em segundos) das faixas dos histogramas de latência
+LATENCY_BUCKETS = [0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0]
+
+
+class StageMetrics:
+    """
+    Tempos e contadores por etapa do pipeline, com histograma dos status resultantes.
+    Os métodos medidos são substituídos, na própria instância, por versões cronometradas (ver instrument), de modo que
+    não há custo quando as métricas não são utilizadas.
+    Etapas medidas com observe também têm um histograma de latências (ver LATENCY_BUCKETS).
+    As métricas são gravadas em path, em JSON ou no formato textfile do Prometheus, a cada interval segundos (verificado
+    a cada documento obtido, ver timed_iter, ou a cada observação) e ao final, com write.
+    As atualizações e a leitura das métricas são protegidas por um lock, pois a persistência pode ser cronometrada em
+    uma thread dedicada (--async_persist).
+    """
+
+    def __init__(self, path=None, metrics_format='json', interval=METRICS_INTERVAL, prefix=METRICS_PREFIX):
+        if metrics_format not in METRICS_FORMATS:
+            raise ValueError('Metrics format {0} is not supported'.format(metrics_format))
+
+        self.path = path
+        self.metrics_format = metrics_format
+        self.interval = interval
+        self.prefix = prefix
+
+        self.seconds = {}
+        self.calls = {}
+        self.counters = {}
+        self.statuses = {}
+        self.histograms = {}
+        self.gauges = {}
+
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+
+        self.start_time = time.time()
+        self.last_write = self.start_time
+
+    def add(self, stage: str, seconds: float):
+        """
+        Contabiliza uma execução de uma etapa.
+
+        :param stage: nome da etapa
+        :param seconds: duração da execução
+        """
+        with self.lock:
+            self.seconds[stage] = self.seconds.get(stage, 0.0) + seconds
+            self.calls[stage] = self.calls.get(stage, 0) + 1
+
+    def incr(self, name: str, n=1):
+        """
+        Incrementa um contador.
+
+        :param name: nome do contador
+        :param n: incremento
+        """
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def observe(self, stage: str, seconds: float):
+        """
+        Contabiliza uma execução de uma etapa e sua latência no histograma da etapa. Grava as métricas se interval
+        segundos se passaram desde a última gravação.
+
+        :param stage: nome da etapa
+        :param seconds: duração da execução
+        """
+        self.add(stage, seconds)
+
+        with self.lock:
+            buckets = self.histograms.get(stage)
+            if buckets is None:
+                buckets = self.histograms[stage] = [0] * (len(LATENCY_BUCKETS) + 1)
+            buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+
+        self.maybe_write()
+
+    def set_gauge(self, name: str, value):
+        """
+        Define o valor atual de uma medida.
+
+        :param name: nome da medida
+        :param value: valor
+        """
+        with self.lock:
+            self.gauges[name] = value
+
+    def count_statuses(self, std_citations: dict):
+        """
+        Contabiliza os status de referências citadas normalizadas.
+
+        :param std_citations: dicionário de id da referência citada para dados normalizados
+        """
+        with self.lock:
+            for v in std_citations.values():
+                status = v.get('status')
+                self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    def timed(self, function, stage: str):
+        """
+        Obtém uma versão cronometrada de function, cujas execuções são contabilizadas em stage.
+
+        :param function: função
+        :param stage: nome da etapa
+        :return: função cronometrada
+        """
+        perf_counter = time.perf_counter
+        add = self.add
+
+        def timed_function(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                add(stage, perf_counter() - start)
+
+        return timed_function
+
+    def instrument(self, obj, methods: dict):
+        """
+        Substitui, na instância obj, métodos por versões cronometradas.
+
+        :param obj: instância
+        :param methods: dicionário de nome do método para nome da etapa
+        """
+        for name, stage in methods.items():
+            setattr(obj, name, self.timed(getattr(obj, name), stage))
+
+    def timed_iter(self, iterable, stage='fetch'):
+        """
+        Repassa os itens de iterable, contabilizando em stage o tempo de obtenção de cada um. A cada item, grava as
+        métricas se interval segundos se passaram desde a última gravação.
+
+        :param iterable: iterável (por exemplo, de documentos)
+        :param stage: nome da etapa
+        :return: gerador dos mesmos itens
+        """
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self.add(stage, time.perf_counter() - start)
+
+            self.incr('documents')
+            self.maybe_write()
+            yield item
+
+    def snapshot(self):
+        """
+        Obtém uma cópia consistente das métricas, que pode ser percorrida enquanto outras threads as atualizam.
+
+        :return: dicionário com cópias de seconds, calls, counters, statuses, gauges e histograms
+        """
+        with self.lock:
+            return {
+                'seconds': dict(self.seconds),
+                'calls': dict(self.calls),
+                'counters': dict(self.counters),
+                'statuses': dict(self.statuses),
+                'gauges': dict(self.gauges),
+                'histograms': {stage: list(buckets) for stage, buckets in self.histograms.items()},
+            }
+
+    def to_dict(self):
+        """
+        Obtém as métricas em formato de dicionário.
+
+        :return: dicionário com tempo decorrido, etapas (segundos, execuções e média em microssegundos), contadores,
+        status, medidas e histogramas (quantidade de execuções por limite superior de latência, em segundos)
+        """
+        snapshot = self.snapshot()
+        calls = snapshot['calls']
+
+        metrics = {
+            'updated': datetime.now().isoformat(timespec='seconds'),
+            'elapsed_seconds': round(time.time() - self.start_time, 3),
+            'stages': {stage: {'seconds': round(seconds, 6),
+                               'calls': calls[stage],
+                               'mean_us': round(seconds / calls[stage] * 1e6, 2)}
+                       for stage, seconds in sorted(snapshot['seconds'].items())},
+            'counters': dict(sorted(snapshot['counters'].items())),
+        }
+
+        if snapshot['statuses']:
+            metrics['status'] = {str(k): v for k, v in sorted(snapshot['statuses'].items())}
+
+        if snapshot['gauges']:
+            metrics['gauges'] = dict(sorted(snapshot['gauges'].items()))
+
+        if snapshot['histograms']:
+            metrics['histograms'] = {stage: {str(le): n for le, n in zip(LATENCY_BUCKETS + ['+Inf'], buckets) if n}
+                                     for stage, buckets in sorted(snapshot['histograms'].items())}
+
+        return metrics
+
+    def to_prometheus(self):
+        """
+        Obtém as métricas no formato de exposição textual do Prometheus (para o coletor textfile do node_exporter).
+
+        :return: texto com as métricas
+        """
+        snapshot = self.snapshot()
+        lines = []
+
+        prefix = self.prefix
+
+        def add_metric(name, help_text, samples, label=None):
+            lines.append('# HELP {0}_{1} {2}'.format(prefix, name, help_text))
+            lines.append('# TYPE {0}_{1} {2}'.format(prefix, name, 'counter' if name.endswith('_total') else 'gauge'))
+            for key, value in samples:
+                labels = '{%s="%s"}' % (label, key) if label else ''
+                lines.append('{0}_{1}{2} {3}'.format(prefix, name, labels, value))
+
+        add_metric('elapsed_seconds', 'Time since the run started.', [(None, round(time.time() - self.start_time, 3))])
+        add_metric('stage_seconds_total', 'Time spent in each pipeline stage.',
+                   sorted(snapshot['seconds'].items()), 'stage')
+        add_metric('stage_calls_total', 'Executions of each pipeline stage.', sorted(snapshot['calls'].items()), 'stage')
+        add_metric('events_total', 'Pipeline counters.', sorted(snapshot['counters'].items()), 'event')
+
+        if snapshot['statuses']:
+            add_metric('citations_status_total', 'Standardized citations by resulting status.',
+                       sorted(snapshot['statuses'].items()), 'status')
+
+        if snapshot['gauges']:
+            add_metric('gauge', 'Current values.', sorted(snapshot['gauges'].items()), 'name')
+
+        if snapshot['histograms']:
+            lines.append('# HELP {0}_latency_seconds Latency of each pipeline stage.'.format(prefix))
+            lines.append('# TYPE {0}_latency_seconds histogram'.format(prefix))
+            for stage, buckets in sorted(snapshot['histograms'].items()):
+                cumulative = 0
+                for le, n in zip(LATENCY_BUCKETS + ['+Inf'], buckets):
+                    cumulative += n
+                    lines.append('{0}_latency_seconds_bucket{{stage="{1}",le="{2}"}} {3}'.format(prefix, stage, le, cumulative))
+                lines.append('{0}_latency_seconds_sum{{stage="{1}"}} {2}'.format(prefix, stage, snapshot['seconds'][stage]))
+                lines.append('{0}_latency_seconds_count{{stage="{1}"}} {2}'.format(prefix, stage, snapshot['calls'][stage]))
+
+        return '\n'.join(lines) + '\n'
+
+    def write(self):
+        """
+        Grava as métricas em path, substituindo o arquivo de forma atômica.
+        """
+        self.last_write = time.time()
+
+        if not self.path:
+            return
+
+        if self.metrics_format == 'prometheus':
+            content = self.to_prometheus()
+        else:
+            content = json.dumps(self.to_dict(), indent=2) + '\n'
+
+        # Gravações simultâneas (de threads diferentes) compartilhariam o arquivo temporário
+        path_tmp = self.path + '.tmp'
+        with self.write_lock:
+            try:
+                with open(path_tmp, 'w') as f:
+                    f.write(content)
+                os.replace(path_tmp, self.path)
+            except OSError as e:
+                logging.error('Could not write metrics to %s: %s' % (self.path, e))
+
+    def maybe_write(self):
+        """
+        Grava as métricas, caso interval segundos tenham se passado desde a última gravação.
+        """
+        if self.interval > 0 and time.time() - self.last_write >= self.interval:
+            self.write()
+
+    def log_summary(self):
+        """
+        Registra no log o tempo de cada etapa, os contadores, as medidas e o histograma de status.
+        """
+        snapshot = self.snapshot()
+        calls = snapshot['calls']
+
+        for stage, seconds in sorted(snapshot['seconds'].items(), key=lambda i: -i[1]):
+            logging.info('Stage {0}: {1:.2f}s in {2} calls ({3:.1f}us per call)'.format(
+                stage, seconds, calls[stage], seconds / calls[stage] * 1e6))
+
+        if snapshot['counters']:
+            logging.info('Counters: %s' % ', '.join('%s=%d' % i for i in sorted(snapshot['counters'].items())))
+
+        if snapshot['gauges']:
+            logging.info('Gauges: %s' % ', '.join('%s=%s' % i for i in sorted(snapshot['gauges'].items())))
+
+        if snapshot['statuses']:
+            logging.info('Status: %s' % ', '.join('%s=%d' % i for i in sorted(snapshot['statuses'].items())))
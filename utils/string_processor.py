@@ -7,6 +7,40 @@ parenthesis_pattern = re.compile(r'[-a-zA-ZÀ-ÖØ-öø-ÿ|0-9]*\([-a-zA-ZÀ-Ö
 doi_pattern = re.compile(r'\d{2}\.\d+/.*$')
 special_chars = ['@', '&']
 special_words = ['IMPRESSO', 'ONLINE', 'CDROM', 'PRINT', 'ELECTRONIC']
+special_words_pattern = re.compile('|'.join(special_words))
+
+# Quantidade de pontos de código pré-calculados nas tabelas de tradução (Latin-1, Latin Extended-A e B); os demais
+# são calculados e armazenados na primeira ocorrência
+TRANSLATION_TABLE_SIZE = 0x250
+
+
+class CharTranslationTable(dict):
+    """
+    Tabela de tradução (para str.translate) que mapeia cada caractere para o resultado de uma função aplicada a ele.
+    Caracteres ausentes na tabela são calculados e armazenados no primeiro acesso.
+    Textos ASCII são traduzidos com uma cópia da tabela restrita aos caracteres ASCII, um dicionário simples, cuja
+    consulta por str.translate é mais rápida.
+    """
+
+    def __init__(self, function, size=TRANSLATION_TABLE_SIZE):
+        super().__init__()
+        self.function = function
+        for i in range(size):
+            self[i] = function(chr(i))
+        self.ascii = {i: self[i] for i in range(128)}
+
+    def __missing__(self, key):
+        value = self.function(chr(key))
+        self[key] = value
+        return value
+
+    def translate(self, text):
+        """
+        Aplica a tabela a text.
+        :param text: texto a ser tratado
+        :return: texto traduzido
+        """
+        return text.translate(self.ascii if text.isascii() else self)
 
 
 def remove_invalid_chars(text):
@@ -61,6 +95,25 @@ def remove_double_spaces(text):
     return text.strip()
 
 
+def collapse_spaces(text):
+    """
+    Equivalente a remove_double_spaces, com uma única passagem sobre text.
+    :param text: texto a ser tratado
+    :return: texto sem espaços duplos
+    """
+    if '  ' in text:
+        text = ' '.join([t for t in text.split(' ') if t])
+    return text.strip()
+
+
+# Remoção de acentos seguida da manutenção de caracteres alpha, numéricos e espaço, caractere a caractere. A
+# decomposição NFKD de um texto difere da concatenação das decomposições de seus caracteres apenas na ordem das marcas
+# combinantes, que não são ASCII e são descartadas por remove_accents
+author_name_table = CharTranslationTable(lambda c: alpha_num_space(remove_accents(c)))
+journal_title_table = CharTranslationTable(lambda c: alpha_num_space(remove_accents(c), include_special_chars=True).upper())
+invalid_chars_table = {i: remove_invalid_chars(chr(i)) for i in range(128)}
+
+
 def preprocess_author_name(text):
     """
     Procedimento que trata nome de autor.
@@ -71,7 +124,7 @@ def preprocess_author_name(text):
     :param text: nome do autor a ser tratado
     :return: nome tratado do autor
     """
-    return remove_double_spaces(alpha_num_space(remove_accents(text)))
+    return collapse_spaces(author_name_table.translate(text))
 
 
 def preprocess_doi(text):
@@ -107,15 +160,17 @@ def preprocess_journal_title(text, use_remove_invalid_chars=False):
 
     # Caso solicitado, remove caracteres inválidos
     if use_remove_invalid_chars:
-        text = remove_invalid_chars(text)
-
-    # Remove parenteses e conteúdo interno
-    parenthesis_search = re.search(parenthesis_pattern, text)
-    while parenthesis_search is not None:
-        text = text[:parenthesis_search.start()] + text[parenthesis_search.end():]
-        parenthesis_search = re.search(parenthesis_pattern, text)
-
-    # Remove palavras especiais
-    for sw in special_words:
-        text = text.replace(sw, '')
-    return remove_double_spaces(alpha_num_space(remove_accents(text), include_special_chars=True)).upper()
+        text = text.translate(invalid_chars_table)
+
+    # Remove parenteses e conteúdo interno. Um trecho removido não contém caracteres que impeçam um casamento anterior,
+    # logo uma única substituição equivale a remover os casamentos um a um
+    if '(' in text:
+        text = parenthesis_pattern.sub('', text)
+
+    # Remove palavras especiais, na ordem de special_words (a remoção de uma pode formar outra)
+    if special_words_pattern.search(text):
+        for sw in special_words:
+            text = text.replace(sw, '')
+
+    # Remove acentos, mantém caracteres alpha, numéricos, espaço e special_chars e transforma para caixa alta
+    return collapse_spaces(journal_title_table.translate(text))